@@ -0,0 +1,161 @@
+import os
+import time
+import socket
+import datetime
+import threading
+import collections
+import concurrent.futures
+
+import numpy as np
+from googleapiclient.errors import HttpError
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+import instrumentacao
+
+# Agendador das chamadas à API do Google Sheets.
+# Toda leitura da planilha passa por aqui:
+# - chamadas idênticas em andamento são unificadas (a segunda espera a resposta da primeira);
+# - cada tentativa consome a cota por minuto (COTA_POR_MINUTO); sem cota, a chamada espera a janela liberar;
+# - erros temporários (429, 5xx, timeout) são repetidos com espera exponencial aleatória;
+# - latência, cota e erros ficam registrados e saem em metricas().
+# Enquanto uma repetição está pendente, as sessões continuam lendo os dados que já estão em cache
+# (o atualizador de dados_planilha e a lista de abas de historico.py atualizam em segundo plano).
+
+COTA_POR_MINUTO = int(os.getenv("COTA_POR_MINUTO", "50"))
+TENTATIVAS = int(os.getenv("TENTATIVAS_API", "5"))
+ESPERA_BASE = 1
+ESPERA_MAXIMA = 30
+JANELA_COTA = 60
+STATUS_TEMPORARIOS = {429, 500, 502, 503, 504}
+AMOSTRAS_LATENCIA = 500
+
+
+def erro_temporario(err):
+    if isinstance(err, HttpError):
+        return err.resp.status in STATUS_TEMPORARIOS
+    return isinstance(err, (socket.timeout, TimeoutError, ConnectionError))
+
+
+class AgendadorBuscas:
+    def __init__(self, cota_por_minuto=COTA_POR_MINUTO, tentativas=TENTATIVAS):
+        self.cota_por_minuto = cota_por_minuto
+        self.tentativas = tentativas
+        self._em_andamento = {}
+        self._chamadas = collections.deque()
+        self._latencias = collections.deque(maxlen=AMOSTRAS_LATENCIA)
+        self._contadores = collections.Counter()
+        self._erros = collections.Counter()
+        self._espera_cota = 0.0
+        self._ultima_falha = None
+        self._lock = threading.Lock()
+
+    # Executa funcao() uma vez para todas as chamadas com a mesma chave que chegarem enquanto ela roda.
+    # O resultado é compartilhado entre quem esperou: não deve ser alterado.
+    def executar(self, chave, funcao):
+        with self._lock:
+            self._contadores['chamadas'] += 1
+            futuro = self._em_andamento.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = concurrent.futures.Future()
+                self._em_andamento[chave] = futuro
+            else:
+                self._contadores['coalescidas'] += 1
+        if not dono:
+            return futuro.result()
+
+        try:
+            resultado = self._com_repeticao(funcao, f'api:{chave[0]}')
+        except BaseException as err:
+            futuro.set_exception(err)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+
+    def _com_repeticao(self, funcao, etapa):
+        for tentativa in Retrying(
+            retry=retry_if_exception(erro_temporario),
+            wait=wait_random_exponential(multiplier=ESPERA_BASE, max=ESPERA_MAXIMA),
+            stop=stop_after_attempt(self.tentativas),
+            before_sleep=self._registrar_repeticao,
+            reraise=True,
+        ):
+            with tentativa:
+                return self._tentar(funcao, etapa)
+
+    def _registrar_repeticao(self, estado):
+        with self._lock:
+            self._contadores['repeticoes'] += 1
+        print(f'Repetindo chamada à planilha em {estado.next_action.sleep:.1f}s: {estado.outcome.exception()}')
+
+    def _tentar(self, funcao, etapa):
+        self._reservar_cota()
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao()
+        except Exception as err:
+            with self._lock:
+                self._contadores['falhas'] += 1
+                self._erros[err.resp.status if isinstance(err, HttpError) else type(err).__name__] += 1
+                self._ultima_falha = datetime.datetime.now()
+            raise
+        duracao = time.perf_counter() - inicio
+        with self._lock:
+            self._contadores['sucessos'] += 1
+            self._latencias.append(duracao)
+        instrumentacao.registrar(etapa, duracao)
+        return resultado
+
+    # Janela deslizante de um minuto: espera até caber mais uma chamada na cota
+    def _reservar_cota(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                while self._chamadas and agora - self._chamadas[0] >= JANELA_COTA:
+                    self._chamadas.popleft()
+                if len(self._chamadas) < self.cota_por_minuto:
+                    self._chamadas.append(agora)
+                    self._contadores['tentativas'] += 1
+                    return
+                espera = JANELA_COTA - (agora - self._chamadas[0])
+                self._contadores['esperas_cota'] += 1
+                self._espera_cota += espera
+            time.sleep(espera)
+
+    def metricas(self):
+        with self._lock:
+            agora = time.monotonic()
+            usada = sum(1 for momento in self._chamadas if agora - momento < JANELA_COTA)
+            latencias = np.array(self._latencias)
+            return {
+                'chamadas': self._contadores['chamadas'],
+                'coalescidas': self._contadores['coalescidas'],
+                'tentativas': self._contadores['tentativas'],
+                'sucessos': self._contadores['sucessos'],
+                'falhas': self._contadores['falhas'],
+                'repeticoes': self._contadores['repeticoes'],
+                'erros': dict(self._erros),
+                'ultima_falha': self._ultima_falha,
+                'cota_por_minuto': self.cota_por_minuto,
+                'cota_usada_no_minuto': usada,
+                'esperas_cota': self._contadores['esperas_cota'],
+                'espera_cota_segundos': round(self._espera_cota, 3),
+                'latencia_p50': float(np.percentile(latencias, 50)) if latencias.size else None,
+                'latencia_p95': float(np.percentile(latencias, 95)) if latencias.size else None,
+                'latencia_max': float(latencias.max()) if latencias.size else None,
+            }
+
+
+agendador = AgendadorBuscas()
+
+
+def executar(chave, funcao):
+    return agendador.executar(chave, funcao)
+
+
+def metricas():
+    return agendador.metricas()
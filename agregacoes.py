@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import calendario
+import ingestao
+
+# Agregações compartilhadas pelos painéis.
+# Cada função recebe o DataFrame tratado e a versão dos dados; o resultado fica
+# memorizado por versão e é reaproveitado por todos os painéis e sessões.
+# (o DataFrame vem com "_" na frente para o Streamlit não calcular hash dele)
+
+
+def codigos_categoria(serie, valores):
+    categorias = serie.cat.categories
+    return [categorias.get_loc(valor) for valor in valores if valor in categorias]
+
+
+# Pago, Ag_Inss, Valor_Pago, Bloqueado e Pendente por vendedor numa única passada:
+# tabela cruzada Vendedor x Status por bincount dos códigos das categorias,
+# mais somas mascaradas para o valor pago e as pendências do perfil ATUAL.
+def calcular_metricas_por_vendedor(vendas):
+    vendedor = vendas['Vendedor']
+    status = vendas['Status']
+    codigos = vendedor.cat.codes.to_numpy()
+    validos = codigos >= 0
+    codigos = codigos[validos]
+    codigos_status = status.cat.codes.to_numpy()[validos].astype(np.int64) + 1
+
+    total_vendedores = len(vendedor.cat.categories)
+    total_status = len(status.cat.categories) + 1
+    tabela = np.bincount(
+        codigos.astype(np.int64) * total_status + codigos_status, minlength=total_vendedores * total_status
+    ).reshape(total_vendedores, total_status)
+
+    def contar(*valores):
+        colunas = [codigo + 1 for codigo in codigos_categoria(status, valores)]
+        return tabela[:, colunas].sum(axis=1).astype(np.int32)
+
+    pago = (status == 'PAGO').to_numpy()[validos]
+    pendente_atual = ((status == 'PENDENTE') & (vendas['Perfil'] == 'ATUAL')).to_numpy()[validos]
+    valor_pago = np.bincount(codigos, weights=np.where(pago, vendas['Valor'].to_numpy()[validos], 0), minlength=total_vendedores)
+    pendentes = np.bincount(codigos, weights=pendente_atual, minlength=total_vendedores).astype(np.int32)
+
+    metricas = pd.DataFrame({
+        'Pago': contar('PAGO'),
+        'Ag_Inss': contar('AG. INSS'),
+        'Valor_Pago': valor_pago,
+        'Bloqueado': contar('BLOQUEADO'),
+        'Pendente': pendentes + contar('CANCELADO'),
+    }, index=pd.Index(vendedor.cat.categories.astype(object), name='Vendedor'))
+    return metricas[tabela.sum(axis=1) > 0]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def metricas_por_vendedor(_vendas, versao):
+    return calcular_metricas_por_vendedor(_vendas)
+
+
+# Cubo com quantidade e soma de Valor por Status x Produto x Data.
+# Tem no máximo status x produtos x dias linhas, então as consultas não crescem com o volume do mês.
+# O valor é somado em float64: em float32 o total do mês perderia os centavos.
+def calcular_cubo_status_produto(vendas):
+    valor = vendas['Valor'].astype(np.float64)
+    cubo = valor.groupby([vendas['Status'], vendas['Produto'], vendas['Data']], observed=True, dropna=False).agg(
+        Quantidade='size', Valor='sum'
+    )
+    return cubo.astype({'Quantidade': np.int32})
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cubo_status_produto(_vendas, versao):
+    return calcular_cubo_status_produto(_vendas)
+
+
+def somar_cubo(cubo, coluna, status=None, produto=None):
+    selecao = cubo[coluna]
+    if status is not None:
+        selecao = selecao[selecao.index.get_level_values('Status') == status]
+    if produto is not None:
+        selecao = selecao[selecao.index.get_level_values('Produto') == produto]
+    return selecao.sum()
+
+
+# Aceites (Pago, Ag. INSS e Bloqueado) e valor aceito por vendedor e por dia corrido do mês, numa passada
+# de bincount. A primeira coluna é o último dia do mês anterior, onde fica o estoque.
+# É a base do painel diário: qualquer dia do mês sai desta tabela, sem ler a aba DIÁRIO.
+def calcular_aceites_diarios(vendas, inicio_mes):
+    dias = pd.date_range(ingestao.data_estoque(inicio_mes), calendario.fim_do_mes(inicio_mes), freq='D')
+    vendedor = vendas['Vendedor']
+    datas = vendas['Data']
+    selecao = (vendas['Status'].isin(ingestao.STATUS_ACEITE) & datas.notna() & (vendedor.cat.codes >= 0)).to_numpy()
+    codigos = vendedor.cat.codes.to_numpy()[selecao].astype(np.int64)
+    posicoes = (datas.to_numpy()[selecao] - dias[0].to_datetime64()) // np.timedelta64(1, 'D')
+    chaves = codigos * len(dias) + np.clip(posicoes, 0, len(dias) - 1)
+
+    total_vendedores = len(vendedor.cat.categories)
+    forma = (total_vendedores, len(dias))
+    quantidade = np.bincount(chaves, minlength=total_vendedores * len(dias)).reshape(forma).astype(np.int32)
+    valor = np.bincount(
+        chaves, weights=vendas['Valor'].to_numpy()[selecao].astype(np.float64), minlength=total_vendedores * len(dias)
+    ).reshape(forma)
+    indice = pd.Index(vendedor.cat.categories.astype(object), name='Vendedor')
+    return pd.DataFrame(quantidade, index=indice, columns=dias), pd.DataFrame(valor, index=indice, columns=dias)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def aceites_diarios(_vendas, versao, inicio_mes):
+    return calcular_aceites_diarios(_vendas, inicio_mes)
+
+
+# Painel de um dia, um vendedor por linha (os ativos da equipe do mês e os que têm propostas):
+# aceites do dia, aceites anteriores no mês (com o estoque), total do mês até o dia,
+# meta do dia (o que falta da meta do mês dividido pelos dias úteis restantes, contando o dia)
+# e quanto falta para ela. Como no plano de recuperação, só os vendedores ativos têm meta.
+def resumo_do_dia(aceites, dia, metas):
+    quantidade, valor = aceites
+    dia = pd.Timestamp(dia)
+    metas = metas[metas['Ativo'].eq(True)]
+    vendedores = quantidade.index.union(metas.index)
+    quantidade = quantidade.reindex(vendedores, fill_value=0)
+    valor = valor.reindex(vendedores, fill_value=0)
+    anteriores = quantidade.columns < dia
+
+    aceite_dia = quantidade[dia] if dia in quantidade.columns else pd.Series(0, index=vendedores)
+    aceite_anterior = quantidade.loc[:, anteriores].sum(axis=1)
+    restantes = max(int(calendario.calendario.dias_uteis(dia.date(), calendario.fim_do_mes(dia))), 1)
+    falta_mes = (metas['Meta Cartões'].reindex(vendedores).fillna(0) - aceite_anterior).clip(lower=0)
+    meta_dia = np.ceil(falta_mes / restantes).astype(int)
+
+    return pd.DataFrame({
+        'Meta Dia': meta_dia,
+        'Aceite Dia': aceite_dia,
+        'Aceite Anterior': aceite_anterior,
+        'Total': aceite_anterior + aceite_dia,
+        'Falta': (meta_dia - aceite_dia).clip(lower=0),
+        'Valor': valor[dia] if dia in valor.columns else pd.Series(0.0, index=vendedores),
+    }, index=vendedores).rename_axis('Vendedor').reset_index()
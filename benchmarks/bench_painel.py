@@ -0,0 +1,271 @@
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+
+# Benchmark do painel sobre a planilha falsa (planilha_fake.py).
+# Cada tamanho roda num processo separado, com diretórios de snapshots e histórico temporários:
+#   - etapas de dados chamadas diretamente (ingestão, cubo, métricas, projeções de vendedores e de comissões);
+#   - o app inteiro pelo AppTest do Streamlit: primeira carga e reexecuções das páginas Home e Indicadores
+#     (gerente), com o tempo de desenho de cada seção (painel_mensal, painel_recuperacao, graficos...).
+# Os resultados vão para RESULTADOS (JSONL, uma linha por tamanho e commit) e cada execução é comparada
+# com a última de outro commit na mesma máquina, marcando as etapas que ficaram mais lentas que a TOLERANCIA.
+#
+#   python benchmarks/bench_painel.py --linhas 1000 10000 100000 1000000
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados.jsonl')
+LINHAS_PADRAO = [1000, 10000, 100000]
+TOLERANCIA = 0.2
+# Abaixo disso a variação é ruído de medição
+MINIMO_COMPARAVEL = 0.005
+PIN_GERENTE = '1234'
+IMAGENS = ['Sorfcred.png', 'bmg.png', 'facta.png', 'amigoz.jpg']
+SECOES_MEDIDAS = {}
+
+
+def mediana_tempo(funcao, repeticoes):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def preparar_ambiente(diretorio):
+    os.environ['DIRETORIO_SNAPSHOTS'] = os.path.join(diretorio, 'snapshots')
+    os.environ['DIRETORIO_HISTORICO'] = os.path.join(diretorio, 'historico')
+    os.environ['SPREADSHEET_ID'] = 'planilha-fake'
+    os.environ['SENHA_GERENTE'] = PIN_GERENTE
+    os.environ.pop('ABA_MES_ATUAL', None)
+    sys.path.insert(0, RAIZ)
+    # As imagens da barra lateral não fazem parte do repositório
+    from PIL import Image
+    for imagem in IMAGENS:
+        origem = os.path.join(RAIZ, imagem)
+        destino = os.path.join(diretorio, imagem)
+        if os.path.exists(origem):
+            os.symlink(origem, destino)
+        else:
+            Image.new('RGB', (8, 8), 'white').save(destino)
+    os.chdir(diretorio)
+
+
+def medir_etapas(planilha, repeticoes):
+    import dados_planilha
+    import ingestao
+    import agregacoes
+    import calendario
+    import instrumentacao
+    import regras_comissao
+    import servico_dados
+    import numpy as np
+
+    valores = planilha.intervalo('Fev')['values']
+    etapas = {}
+
+    def ingerir():
+        df = dados_planilha.para_dataframe(valores)
+        return ingestao.selecionar_validas(ingestao.preparar_vendas(df, 2, 2025))
+    etapas['ingestao'], validas = mediana_tempo(ingerir, repeticoes)
+    planilha_df = dados_planilha.para_dataframe(valores)
+    # Como no painel: métricas e projeções dos vendedores sobre todas as propostas, cubo sobre as válidas
+    vendas = ingestao.preparar_vendas(planilha_df, 2, 2025)
+    memoria = {
+        'planilha': instrumentacao.memoria_dataframe(planilha_df),
+        'vendas': instrumentacao.memoria_dataframe(vendas),
+        'validas': instrumentacao.memoria_dataframe(validas),
+    }
+    etapas['cubo'], cubo = mediana_tempo(lambda: agregacoes.calcular_cubo_status_produto(validas), repeticoes)
+    etapas['metricas_vendedor'], _ = mediana_tempo(lambda: agregacoes.calcular_metricas_por_vendedor(vendas), repeticoes)
+
+    inicio = ingestao.inicio_do_mes(validas['Data'], 2, 2025)
+    fim = calendario.fim_do_mes(inicio)
+    etapas['projecao_vendedores'], _ = mediana_tempo(
+        lambda: calendario.projecao_na_data(calendario.calendario.curvas_projecao(vendas, inicio.date(), fim), fim),
+        repeticoes,
+    )
+    regras = regras_comissao.obter_regras()
+    etapas['projecao_comissoes'], (_, _, liquida) = mediana_tempo(lambda: regras.calcular(cubo), repeticoes)
+    etapas['simulacao_comissoes'], simulacao = mediana_tempo(
+        lambda: regras.simular_fatores(cubo, servico_dados.FATORES_SIMULACAO), repeticoes
+    )
+    # O cenário com os valores do arquivo tem que reproduzir a projeção da página
+    if simulacao is not None and not np.allclose(simulacao.loc[simulacao['arquivo'], 'receita_liquida'], liquida):
+        raise RuntimeError(f'simulação do cenário atual diverge da projeção de comissões ({liquida})')
+    return etapas, memoria
+
+
+def _app():
+    import painel_vendas
+    painel_vendas.main()
+
+
+def medir_app(planilha, repeticoes, timeout):
+    from streamlit.testing.v1 import AppTest
+    import credenciais
+    import paginas
+    import painel_vendas
+
+    credenciais.build = lambda *args, **kwargs: planilha
+    painel_vendas.obter_credenciais = lambda: True
+    pagina = {}
+    painel_vendas.option_menu = lambda **kwargs: pagina['atual']
+
+    reservar = paginas.reservar
+
+    def reservar_medindo(produtos, desenhar, *nomes):
+        def desenhar_medindo():
+            inicio = time.perf_counter()
+            desenhar()
+            SECOES_MEDIDAS.setdefault(desenhar.__name__, []).append(time.perf_counter() - inicio)
+        return reservar(produtos, desenhar_medindo, *nomes)
+    paginas.reservar = reservar_medindo
+
+    etapas = {}
+    for nome, titulo, pin in [('home', 'Home', None), ('gerente', 'Indicadores', PIN_GERENTE)]:
+        pagina['atual'] = titulo
+        teste = AppTest.from_function(_app, default_timeout=timeout)
+
+        def executar():
+            teste.run()
+            if pin and not teste.text_input[0].value:
+                teste.text_input[0].input(pin)
+                teste.run()
+            if teste.exception:
+                raise RuntimeError(teste.exception[0].value)
+        etapas[f'apptest_{nome}'], _ = mediana_tempo(executar, 1)
+        SECOES_MEDIDAS.clear()
+        etapas[f'apptest_{nome}_rerun'], _ = mediana_tempo(executar, repeticoes)
+        for secao, tempos in SECOES_MEDIDAS.items():
+            etapas[secao] = statistics.median(tempos)
+    return etapas
+
+
+# Roda num processo próprio: um tamanho de planilha, sem caches de outras medições
+def medir(linhas, repeticoes, com_app, timeout):
+    diretorio = tempfile.mkdtemp(prefix='bench_painel_')
+    preparar_ambiente(diretorio)
+    import planilha_fake
+
+    inicio = time.perf_counter()
+    planilha = planilha_fake.planilha_padrao(linhas)
+    geracao = time.perf_counter() - inicio
+
+    etapas, memoria = medir_etapas(planilha, repeticoes)
+    if com_app:
+        etapas.update(medir_app(planilha, repeticoes, timeout))
+    return {
+        'linhas': linhas,
+        'geracao_planilha': round(geracao, 4),
+        'etapas': {nome: round(tempo, 4) for nome, tempo in etapas.items()},
+        'pico_memoria_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'memoria_dados_mb': {nome: round(bytes_ / 1024 / 1024, 2) for nome, bytes_ in memoria.items()},
+        'chamadas_api': len(planilha.chamadas),
+    }
+
+
+def git(*argumentos):
+    try:
+        return subprocess.run(['git', *argumentos], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def identificar_execucao():
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD'),
+        'alterado': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'maquina': platform.node(),
+        'python': platform.python_version(),
+    }
+
+
+def ler_resultados(caminho):
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding='utf-8') as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+# Última medição do mesmo tamanho, na mesma máquina, feita em outro commit
+def referencia(anteriores, resultado):
+    for anterior in reversed(anteriores):
+        if (anterior['linhas'] == resultado['linhas'] and anterior['maquina'] == resultado['maquina']
+                and anterior['commit'] != resultado['commit']):
+            return anterior
+    return None
+
+
+def comparar(resultado, anterior, tolerancia):
+    regressoes = []
+    for etapa, tempo in resultado['etapas'].items():
+        antes = anterior['etapas'].get(etapa) if anterior else None
+        variacao = (tempo - antes) / antes if antes else None
+        marca = ''
+        if variacao is not None and variacao > tolerancia and tempo - antes > MINIMO_COMPARAVEL:
+            marca = '  << REGRESSÃO'
+            regressoes.append(etapa)
+        comparacao = f'{antes:10.4f}s {variacao:+8.1%}' if variacao is not None else ''
+        print(f'  {etapa:28s} {tempo:10.4f}s {comparacao}{marca}')
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do painel sobre a planilha falsa')
+    parser.add_argument('--linhas', type=int, nargs='+', default=LINHAS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--sem-app', action='store_true', help='mede só as etapas de dados, sem o AppTest')
+    parser.add_argument('--timeout', type=float, default=600, help='limite de cada execução do AppTest, em segundos')
+    parser.add_argument('--resultados', default=RESULTADOS)
+    parser.add_argument('--nao-gravar', action='store_true')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--falhar-em-regressao', action='store_true')
+    parser.add_argument('--medir', type=int, help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.medir:
+        print(json.dumps(medir(argumentos.medir, argumentos.repeticoes, not argumentos.sem_app, argumentos.timeout)))
+        return 0
+
+    execucao = identificar_execucao()
+    anteriores = ler_resultados(argumentos.resultados)
+    regressoes = []
+    for linhas in argumentos.linhas:
+        comando = [sys.executable, os.path.abspath(__file__), '--medir', str(linhas),
+                   '--repeticoes', str(argumentos.repeticoes), '--timeout', str(argumentos.timeout)]
+        if argumentos.sem_app:
+            comando.append('--sem-app')
+        processo = subprocess.run(comando, capture_output=True, text=True)
+        if processo.returncode != 0:
+            print(processo.stderr, file=sys.stderr)
+            return processo.returncode
+        resultado = {**execucao, **json.loads(processo.stdout.strip().splitlines()[-1])}
+
+        anterior = referencia(anteriores, resultado)
+        print(f"{linhas} linhas (pico de memória {resultado['pico_memoria_mb']} MB)"
+              + (f", comparado com {anterior['commit']}" if anterior else ''))
+        print('  memória dos dados (MB): ' + ', '.join(f'{nome} {mb}' for nome, mb in resultado['memoria_dados_mb'].items()))
+        regressoes += [f'{linhas}:{etapa}' for etapa in comparar(resultado, anterior, argumentos.tolerancia)]
+
+        if not argumentos.nao_gravar:
+            with open(argumentos.resultados, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+
+    if regressoes:
+        print('Regressões: ' + ', '.join(regressoes))
+    return 1 if regressoes and argumentos.falhar_em_regressao else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import os
+import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import ingestao
+
+# Calendário de dias úteis usado nas projeções.
+# Dias úteis são de segunda a sexta, tirando os feriados nacionais (fixos e os móveis, calculados
+# a partir da Páscoa) e os feriados locais de FERIADOS_PATH (CSV com a coluna Data).
+# As contagens usam np.busday_count / np.busday_offset, então valem para qualquer período
+# (mês corrente, meses do histórico ou um período filtrado) sem ler nada da planilha.
+
+FERIADOS_FIXOS = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (11, 20), (12, 25)]
+# Dias a partir do domingo de Páscoa: Carnaval (segunda e terça), Sexta-feira Santa e Corpus Christi
+FERIADOS_MOVEIS = [-48, -47, -2, 60]
+FERIADOS_PATH = os.getenv("FERIADOS_PATH", "feriados.csv")
+ANOS_CALENDARIO = range(2020, 2041)
+STATUS_PROJECAO = ['PAGO', 'AG. INSS']
+
+
+# Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)
+def pascoa(ano):
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(ano, mes, dia + 1)
+
+
+def feriados_nacionais(anos):
+    datas = [datetime.date(ano, mes, dia) for ano in anos for mes, dia in FERIADOS_FIXOS]
+    datas += [pascoa(ano) + datetime.timedelta(days=dias) for ano in anos for dias in FERIADOS_MOVEIS]
+    return datas
+
+
+def ler_feriados_locais(caminho):
+    if not os.path.exists(caminho):
+        return []
+    tabela = pd.read_csv(caminho, dtype=str)
+    return list(pd.to_datetime(tabela['Data'], format=ingestao.FORMATO_DATA).dt.date)
+
+
+def para_dia(datas):
+    return np.asarray(datas, dtype='datetime64[D]')
+
+
+class Calendario:
+    def __init__(self, feriados):
+        self.feriados = np.unique(para_dia(feriados))
+        self.agenda = np.busdaycalendar(holidays=self.feriados)
+
+    # Dias úteis de inicio a fim, inclusive (aceita datas soltas ou arrays)
+    def dias_uteis(self, inicio, fim):
+        return np.busday_count(para_dia(inicio), para_dia(fim) + 1, busdaycal=self.agenda)
+
+    # (passados, úteis, restantes) de um período, contando os passados até a data de referência
+    def dias_do_periodo(self, inicio, fim, referencia):
+        uteis = int(self.dias_uteis(inicio, fim))
+        passados = int(self.dias_uteis(inicio, min(referencia, fim)))
+        return passados, uteis, uteis - passados
+
+    # Posição de cada data entre os dias úteis do período; fim de semana e feriado contam no dia útil seguinte
+    def indice_dia_util(self, datas, inicio):
+        return np.busday_count(para_dia(inicio), para_dia(datas), busdaycal=self.agenda)
+
+    def datas_uteis(self, inicio, fim):
+        dias = np.arange(self.dias_uteis(inicio, fim))
+        return pd.DatetimeIndex(np.busday_offset(para_dia(inicio), dias, roll='forward', busdaycal=self.agenda))
+
+    # Curva de projeção de cada vendedor numa única passada: aceites (Pago + Ag. INSS)
+    # acumulados até cada dia útil, divididos pelos dias passados e multiplicados pelos dias úteis.
+    # Linhas por vendedor, colunas por dia útil do período.
+    def curvas_projecao(self, vendas, inicio, fim):
+        datas = self.datas_uteis(inicio, fim)
+        uteis = len(datas)
+        vendedor = vendas['Vendedor']
+        selecao = (vendas['Status'].isin(STATUS_PROJECAO) & vendas['Data'].notna() & (vendedor.cat.codes >= 0)).to_numpy()
+        if not uteis:
+            return pd.DataFrame(index=pd.Index(vendedor.cat.categories.astype(object), name='Vendedor'))
+
+        codigos = vendedor.cat.codes.to_numpy()[selecao].astype(np.int64)
+        dias = np.clip(self.indice_dia_util(vendas['Data'].to_numpy()[selecao], inicio), 0, uteis - 1)
+        total_vendedores = len(vendedor.cat.categories)
+        aceites = np.bincount(codigos * uteis + dias, minlength=total_vendedores * uteis).reshape(total_vendedores, uteis)
+        projecao = aceites.cumsum(axis=1) / np.arange(1, uteis + 1) * uteis
+        return pd.DataFrame(projecao, index=pd.Index(vendedor.cat.categories.astype(object), name='Vendedor'), columns=datas)
+
+
+calendario = Calendario(feriados_nacionais(ANOS_CALENDARIO) + ler_feriados_locais(FERIADOS_PATH))
+
+
+def fim_do_mes(inicio_mes):
+    return (pd.Timestamp(inicio_mes) + pd.offsets.MonthEnd(0)).date()
+
+
+# Dias passados, úteis e restantes do mês, até a data de referência
+def dias_do_mes(inicio_mes, referencia):
+    return calendario.dias_do_periodo(pd.Timestamp(inicio_mes).date(), fim_do_mes(inicio_mes), referencia)
+
+
+# Projeção de cada vendedor na data de referência (último dia útil até ela)
+def projecao_na_data(curvas, referencia):
+    colunas = curvas.columns[curvas.columns <= pd.Timestamp(referencia)]
+    if colunas.empty:
+        return pd.Series(0.0, index=curvas.index)
+    return curvas[colunas[-1]]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def curvas_projecao(_vendas, versao, inicio, fim):
+    return calendario.curvas_projecao(_vendas, inicio, fim)
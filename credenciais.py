@@ -0,0 +1,161 @@
+import os
+import time
+import queue
+import datetime
+import threading
+import contextlib
+
+import httplib2
+import google_auth_httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+# Credenciais do Google e clientes da API do Sheets, compartilhados pelo processo.
+# O token é lido do disco uma vez e renovado em segundo plano antes de expirar.
+# Os clientes (documento de descoberta já carregado e conexão HTTP mantida aberta) ficam
+# num pool e são emprestados a quem vai chamar a API; cada cliente atende uma chamada por vez,
+# porque o httplib2 não pode ser usado por duas threads ao mesmo tempo.
+
+ANTECEDENCIA_RENOVACAO = datetime.timedelta(minutes=int(os.getenv("ANTECEDENCIA_RENOVACAO_MINUTOS", "5")))
+ESPERA_APOS_ERRO_RENOVACAO = 60
+TAMANHO_POOL_CLIENTES = int(os.getenv("TAMANHO_POOL_CLIENTES", "4"))
+TIMEOUT_HTTP = int(os.getenv("TIMEOUT_HTTP_SEGUNDOS", "60"))
+
+
+def agora_utc():
+    # As credenciais guardam a expiração em UTC, sem fuso
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class PoolClientes:
+    def __init__(self, gerenciador, tamanho=TAMANHO_POOL_CLIENTES):
+        self.gerenciador = gerenciador
+        self.tamanho = tamanho
+        self._livres = queue.LifoQueue()
+        self._criados = 0
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def _criar(self):
+        http = google_auth_httplib2.AuthorizedHttp(
+            self.gerenciador.credenciais, http=httplib2.Http(timeout=TIMEOUT_HTTP)
+        )
+        return self._geracao, build("sheets", "v4", http=http, cache_discovery=False)
+
+    def _emprestar(self):
+        while True:
+            try:
+                geracao, servico = self._livres.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._criados < self.tamanho:
+                        self._criados += 1
+                        return self._criar()
+                geracao, servico = self._livres.get()
+            if geracao == self._geracao:
+                return geracao, servico
+            # Cliente de credenciais antigas: descarta e cria outro
+            with self._lock:
+                self._criados -= 1
+
+    @contextlib.contextmanager
+    def cliente(self):
+        emprestado = self._emprestar()
+        try:
+            yield emprestado[1]
+        finally:
+            self._livres.put(emprestado)
+
+    # Credenciais trocadas (nova autorização): os clientes existentes deixam de ser usados
+    def invalidar(self):
+        with self._lock:
+            self._geracao += 1
+
+
+class GerenciadorCredenciais:
+    def __init__(self, caminho_token, escopos):
+        self.caminho_token = caminho_token
+        self.escopos = escopos
+        self.credenciais = None
+        self.pool = PoolClientes(self)
+        self._lock = threading.Lock()
+        self._renovador = None
+
+    # Credenciais válidas em memória, renovando se já venceram; None se ainda não há token autorizado
+    def obter(self):
+        with self._lock:
+            if self.credenciais is None and os.path.exists(self.caminho_token):
+                self.credenciais = Credentials.from_authorized_user_file(self.caminho_token, self.escopos)
+            if self.credenciais is None:
+                return None
+            if not self.credenciais.valid:
+                if not (self.credenciais.expired and self.credenciais.refresh_token):
+                    return None
+                self._renovar()
+        self._iniciar_renovador()
+        return self.credenciais
+
+    # Credenciais novas, vindas do fluxo de autorização
+    def definir(self, credenciais):
+        with self._lock:
+            self.credenciais = credenciais
+            self._salvar()
+            self.pool.invalidar()
+        self._iniciar_renovador()
+
+    def cliente(self):
+        return self.pool.cliente()
+
+    def _renovar(self):
+        self.credenciais.refresh(Request())
+        self._salvar()
+
+    def _salvar(self):
+        with open(self.caminho_token, "w") as token:
+            token.write(self.credenciais.to_json())
+
+    def _espera_renovacao(self):
+        expiracao = self.credenciais.expiry
+        if expiracao is None:
+            return None
+        return max((expiracao - ANTECEDENCIA_RENOVACAO - agora_utc()).total_seconds(), 0)
+
+    # Renova o token um pouco antes de vencer, para nenhuma sessão esperar pela renovação
+    def _laco_renovador(self):
+        while True:
+            with self._lock:
+                espera = self._espera_renovacao()
+            if espera is None:
+                return
+            time.sleep(espera)
+            try:
+                with self._lock:
+                    if self._espera_renovacao() == 0:
+                        self._renovar()
+            except Exception as err:
+                # Mantém o token atual; a sessão renova na hora se ele chegar a vencer
+                print(err)
+                time.sleep(ESPERA_APOS_ERRO_RENOVACAO)
+
+    def _iniciar_renovador(self):
+        with self._lock:
+            if self.credenciais.refresh_token is None:
+                return
+            if self._renovador is None or not self._renovador.is_alive():
+                self._renovador = threading.Thread(
+                    target=self._laco_renovador, name="renovador-credenciais", daemon=True
+                )
+                self._renovador.start()
+
+
+_gerenciadores = {}
+_lock_gerenciadores = threading.Lock()
+
+
+def obter_gerenciador(caminho_token, escopos):
+    with _lock_gerenciadores:
+        chave = (os.path.abspath(caminho_token), tuple(escopos))
+        if chave not in _gerenciadores:
+            _gerenciadores[chave] = GerenciadorCredenciais(caminho_token, escopos)
+        return _gerenciadores[chave]
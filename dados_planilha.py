@@ -0,0 +1,348 @@
+import os
+import time
+import threading
+import datetime
+import itertools
+
+import pandas as pd
+from googleapiclient.errors import HttpError
+
+import snapshots
+from leitura_valores import RelatorioLeitura
+from sincronizacao import SincronizacaoIncremental, montar_dataframe
+
+# Camada de acesso aos dados da planilha.
+# O cache é único por processo: todas as sessões do Streamlit leem daqui e só o
+# atualizador em segundo plano conversa com a API depois da primeira carga.
+# Cada versão lida é gravada em snapshot, e a primeira carga do processo parte
+# do snapshot mais recente quando ele existe.
+
+
+def ler_horarios(texto):
+    return sorted({int(h.strip().rstrip('h')) for h in texto.split(',') if h.strip()})
+
+
+# Horários em que a planilha é atualizada (os mesmos avisados nos painéis)
+HORARIOS_MENSAL = ler_horarios(os.getenv("HORARIOS_ATUALIZACAO_MENSAL", "9h"))
+HORARIOS_DIARIO = ler_horarios(os.getenv("HORARIOS_ATUALIZACAO_DIARIO", "11h, 14h, 16h, 18h"))
+
+# Folga após o horário publicado, para dar tempo da planilha terminar de ser preenchida
+MARGEM_ATUALIZACAO = datetime.timedelta(minutes=int(os.getenv("MARGEM_ATUALIZACAO_MINUTOS", "5")))
+# Validade máxima de qualquer leitura, mesmo fora dos horários publicados
+TTL_MAXIMO = datetime.timedelta(minutes=int(os.getenv("TTL_MAXIMO_MINUTOS", "60")))
+# Espera antes de tentar de novo quando a atualização em segundo plano falha
+ESPERA_APOS_ERRO = datetime.timedelta(minutes=1)
+INTERVALO_ATUALIZADOR = 30
+# A cada tantos segundos o atualizador confere se a planilha mudou fora dos horários publicados
+# (a aba DIÁRIO inteira, e só o cabeçalho e o fim da aba do mês); 0 desliga a vigia
+INTERVALO_VIGIA = int(os.getenv("VIGIA_PLANILHA_SEGUNDOS", "60"))
+
+# Versões únicas no processo: servem de chave para os cálculos memorizados por versão dos dados
+_versoes = itertools.count(1)
+
+
+def proxima_atualizacao(momento, horarios):
+    for dia in range(2):
+        data = momento.date() + datetime.timedelta(days=dia)
+        for hora in horarios:
+            horario = datetime.datetime.combine(data, datetime.time(hour=hora)) + MARGEM_ATUALIZACAO
+            if horario > momento:
+                return horario
+    return momento + TTL_MAXIMO
+
+
+def calcular_validade(momento, horarios):
+    return min(proxima_atualizacao(momento, horarios), momento + TTL_MAXIMO)
+
+
+class EntradaCache:
+    def __init__(self, intervalo, horarios, incremental=False):
+        self.intervalo = intervalo
+        self.horarios = horarios
+        self.sincronizacao = SincronizacaoIncremental(intervalo) if incremental else None
+        # DataFrame e versão andam juntos, para uma sessão nunca ler um com a outra de outra leitura
+        self.atual = (None, 0)
+        self.buscado_em = None
+        self.expira_em = None
+        # Horário publicado seguinte à última leitura: passado ele, a aba incremental é relida inteira
+        self.publicada_em = None
+        self.relatorio = None
+
+    @property
+    def dataframe(self):
+        return self.atual[0]
+
+    @property
+    def versao(self):
+        return self.atual[1]
+
+    def expirada(self, agora):
+        return self.expira_em is None or agora >= self.expira_em
+
+    def precisa_carga_completa(self, agora):
+        if self.sincronizacao is None or self.sincronizacao.precisa_carga_completa():
+            return True
+        return self.publicada_em is not None and agora >= self.publicada_em
+
+    # Registra uma leitura; a versão só muda quando o conteúdo muda.
+    # As linhas da API não ficam guardadas: a comparação é feita com o DataFrame já lido.
+    def registrar(self, dataframe, agora, relatorio):
+        if self.dataframe is None or not (dataframe is self.dataframe or dataframe.equals(self.dataframe)):
+            # Avisa uma vez por leitura completa; os blocos da sincronização avisam por conta própria
+            if relatorio is not self.relatorio and (relatorio.malformadas or relatorio.colunas_nao_texto):
+                print(f'{self.intervalo}: {relatorio.resumo()}')
+            self.atual = (dataframe, next(_versoes))
+            snapshots.salvar(self.intervalo, self.dataframe, self.versao, agora)
+        self.relatorio = relatorio
+        self.buscado_em = agora
+        self.expira_em = calcular_validade(agora, self.horarios)
+        self.publicada_em = proxima_atualizacao(agora, self.horarios) if self.horarios else None
+
+    # Parte do último snapshot em disco; já nasce expirada para ser conferida com a planilha
+    def restaurar(self):
+        snapshot = snapshots.carregar_ultimo(self.intervalo)
+        if snapshot is None:
+            return False
+        dataframe, self.buscado_em = snapshot
+        self.atual = (dataframe, next(_versoes))
+        self.expira_em = None
+        return True
+
+
+def para_dataframe(valores, relatorio=None):
+    if not valores:
+        return pd.DataFrame()
+    return montar_dataframe(valores[0], valores[1:], relatorio)
+
+
+class CachePlanilha:
+    def __init__(self, intervalo_atualizador=INTERVALO_ATUALIZADOR, intervalo_vigia=INTERVALO_VIGIA):
+        self.intervalo_atualizador = intervalo_atualizador
+        self.intervalo_vigia = intervalo_vigia
+        self._ultima_vigia = time.monotonic()
+        self._entradas = {}
+        self._buscar = {}
+        self._lock = threading.Lock()
+        self._lock_busca = threading.Lock()
+        self._atualizador = None
+
+    # Busca vários intervalos de uma planilha numa única chamada (values.batchGet).
+    # Abas incrementais já carregadas entram só com a sondagem; os blocos alterados
+    # e as abas que precisam de carga completa vão numa segunda chamada.
+    def _buscar_lote(self, spreadsheet_id, chaves):
+        buscar = self._buscar[spreadsheet_id]
+        agora = datetime.datetime.now()
+        completos = []
+        sondas = {}
+        for chave in chaves:
+            entrada = self._entradas[chave]
+            if entrada.precisa_carga_completa(agora):
+                completos.append(chave)
+            else:
+                sondas[chave] = entrada.sincronizacao.intervalos_sonda()
+
+        intervalos = [intervalo for _, intervalo in completos]
+        intervalos += [intervalo for sonda in sondas.values() for intervalo in sonda]
+        try:
+            lote = buscar(spreadsheet_id, intervalos)
+        except HttpError as err:
+            # Cauda além do limite da grade da aba, por exemplo: recarrega tudo
+            if not sondas or err.resp.status != 400:
+                raise
+            completos += list(sondas)
+            sondas = {}
+            lote = buscar(spreadsheet_id, [intervalo for _, intervalo in completos])
+
+        agora = datetime.datetime.now()
+        posicao = 0
+        for chave in completos:
+            self._carregar(chave, lote[posicao], agora)
+            posicao += 1
+
+        blocos = {}
+        recarregar = []
+        for chave, sonda in sondas.items():
+            respostas = lote[posicao:posicao + len(sonda)]
+            posicao += len(sonda)
+            pedidos = self._entradas[chave].sincronizacao.aplicar_sonda(respostas)
+            if pedidos is None:
+                recarregar.append(chave)
+            else:
+                blocos[chave] = pedidos
+
+        pendentes = {chave: pedidos for chave, pedidos in blocos.items() if pedidos}
+        intervalos = [intervalo for _, intervalo in recarregar]
+        intervalos += [intervalo for pedidos in pendentes.values() for intervalo in pedidos]
+        lote = buscar(spreadsheet_id, intervalos) if intervalos else []
+
+        agora = datetime.datetime.now()
+        posicao = 0
+        for chave in recarregar:
+            self._carregar(chave, lote[posicao], agora)
+            posicao += 1
+        for chave, pedidos in blocos.items():
+            respostas = lote[posicao:posicao + len(pedidos)]
+            posicao += len(pedidos)
+            sincronizacao = self._entradas[chave].sincronizacao
+            sincronizacao.aplicar_blocos(respostas)
+            self._entradas[chave].registrar(sincronizacao.dataframe, agora, self._entradas[chave].relatorio)
+
+    def _carregar(self, chave, valores, agora):
+        entrada = self._entradas[chave]
+        if entrada.sincronizacao is None:
+            relatorio = RelatorioLeitura()
+            entrada.registrar(para_dataframe(valores, relatorio), agora, relatorio)
+        else:
+            entrada.sincronizacao.carregar(valores)
+            entrada.registrar(entrada.sincronizacao.dataframe, agora, entrada.sincronizacao.relatorio)
+
+    # Devolve um DataFrame e a versão dele por nome; só bloqueia na primeira leitura dos intervalos
+    def obter_lote(self, spreadsheet_id, intervalos, buscar):
+        with self._lock:
+            self._buscar[spreadsheet_id] = buscar
+            for intervalo, horarios, incremental in intervalos.values():
+                chave = (spreadsheet_id, intervalo)
+                if chave not in self._entradas:
+                    self._entradas[chave] = EntradaCache(intervalo, horarios, incremental)
+        faltando = [
+            (spreadsheet_id, intervalo) for intervalo, _, _ in intervalos.values()
+            if self._entradas[(spreadsheet_id, intervalo)].dataframe is None
+        ]
+        if faltando:
+            with self._lock_busca:
+                faltando = [
+                    chave for chave in faltando
+                    if self._entradas[chave].dataframe is None and not self._entradas[chave].restaurar()
+                ]
+                if faltando:
+                    self._buscar_lote(spreadsheet_id, faltando)
+        self._iniciar_atualizador()
+        atuais = {nome: self._entradas[(spreadsheet_id, intervalo)].atual for nome, (intervalo, _, _) in intervalos.items()}
+        # Cópia rasa: a sessão pode criar colunas sem alterar o DataFrame compartilhado
+        dataframes = {nome: dataframe.copy(deep=False) for nome, (dataframe, _) in atuais.items()}
+        versoes = {nome: versao for nome, (_, versao) in atuais.items()}
+        return dataframes, versoes
+
+    # Intervalo que deixou de ser usado (aba de um mês já fechado): sai do atualizador
+    def remover(self, spreadsheet_id, intervalo):
+        with self._lock_busca, self._lock:
+            self._entradas.pop((spreadsheet_id, intervalo), None)
+
+    # Relatório da última leitura de cada intervalo: {intervalo: RelatorioLeitura}
+    def relatorios(self, spreadsheet_id):
+        with self._lock:
+            return {
+                intervalo: entrada.relatorio for (planilha, intervalo), entrada in self._entradas.items()
+                if planilha == spreadsheet_id and entrada.relatorio is not None
+            }
+
+    def versao(self, spreadsheet_id, intervalo):
+        entrada = self._entradas.get((spreadsheet_id, intervalo))
+        return entrada.versao if entrada else 0
+
+    # Uma chamada por planilha: os intervalos pequenos são relidos inteiros (a versão só muda se
+    # o conteúdo mudar) e as abas incrementais que mudaram passam pela sincronização normal
+    def _vigiar_lote(self, spreadsheet_id, chaves):
+        intervalos = []
+        for chave in chaves:
+            sincronizacao = self._entradas[chave].sincronizacao
+            intervalos += sincronizacao.intervalos_vigia() if sincronizacao is not None else [chave[1]]
+        lote = self._buscar[spreadsheet_id](spreadsheet_id, intervalos)
+
+        agora = datetime.datetime.now()
+        posicao = 0
+        mudaram = []
+        for chave in chaves:
+            sincronizacao = self._entradas[chave].sincronizacao
+            if sincronizacao is None:
+                self._carregar(chave, lote[posicao], agora)
+                posicao += 1
+            else:
+                if sincronizacao.mudou(lote[posicao:posicao + 2]):
+                    mudaram.append(chave)
+                posicao += 2
+        if mudaram:
+            self._buscar_lote(spreadsheet_id, mudaram)
+
+    def vigiar(self):
+        agora = datetime.datetime.now()
+        with self._lock:
+            vigiados = {}
+            for chave, entrada in self._entradas.items():
+                # Entradas vencidas ou ainda sem carga completa ficam com atualizar_expirados
+                sincronizacao = entrada.sincronizacao
+                if entrada.expirada(agora) or (sincronizacao is not None and sincronizacao.cabecalho is None):
+                    continue
+                vigiados.setdefault(chave[0], []).append(chave)
+        for spreadsheet_id, chaves in vigiados.items():
+            if not self._lock_busca.acquire(blocking=False):
+                return
+            try:
+                self._vigiar_lote(spreadsheet_id, chaves)
+            except Exception as err:
+                # A vigia é só um adiantamento: os horários publicados continuam valendo
+                print(err)
+            finally:
+                self._lock_busca.release()
+
+    def atualizar_expirados(self):
+        agora = datetime.datetime.now()
+        with self._lock:
+            expirados = {}
+            for chave, entrada in self._entradas.items():
+                if entrada.expirada(agora):
+                    expirados.setdefault(chave[0], []).append(chave)
+        for spreadsheet_id, chaves in expirados.items():
+            if not self._lock_busca.acquire(blocking=False):
+                return
+            try:
+                self._buscar_lote(spreadsheet_id, chaves)
+            except Exception as err:
+                # Mantém os dados antigos e tenta de novo mais tarde
+                print(err)
+                for chave in chaves:
+                    self._entradas[chave].expira_em = datetime.datetime.now() + ESPERA_APOS_ERRO
+            finally:
+                self._lock_busca.release()
+
+    def _laco_atualizador(self):
+        while True:
+            self.atualizar_expirados()
+            if self.intervalo_vigia and time.monotonic() - self._ultima_vigia >= self.intervalo_vigia:
+                self._ultima_vigia = time.monotonic()
+                self.vigiar()
+            time.sleep(self.intervalo_atualizador)
+
+    def _iniciar_atualizador(self):
+        with self._lock:
+            if self._atualizador is None or not self._atualizador.is_alive():
+                self._atualizador = threading.Thread(
+                    target=self._laco_atualizador, name="atualizador-planilha", daemon=True
+                )
+                self._atualizador.start()
+
+
+cache = CachePlanilha()
+
+# Todos os intervalos usados pelo painel, buscados juntos num único batchGet.
+# A aba do mês corrente vem da descoberta de abas (historico.py); células de apoio entram aqui,
+# sem novas chamadas à API.
+# (intervalo, horários de atualização, sincronização incremental)
+def intervalos_painel(aba_mes):
+    return {
+        'mes': (aba_mes, HORARIOS_MENSAL, True),
+        'diario': ('DIÁRIO!C7:K21', HORARIOS_DIARIO, False),
+    }
+
+
+# Versão atual de cada intervalo do painel, sem buscar nada na planilha
+def versoes(spreadsheet_id, aba_mes):
+    return {nome: cache.versao(spreadsheet_id, intervalo) for nome, (intervalo, _, _) in intervalos_painel(aba_mes).items()}
+
+
+def relatorios_leitura(spreadsheet_id):
+    return cache.relatorios(spreadsheet_id)
+
+
+def obter_dataframes(spreadsheet_id, buscar, aba_mes):
+    return cache.obter_lote(spreadsheet_id, intervalos_painel(aba_mes), buscar)
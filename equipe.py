@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+# Equipe de vendas e metas por mês.
+# Os vendedores, as metas e a data de início ficam em equipe.csv (ou no arquivo de EQUIPE_PATH),
+# uma versão da equipe por mês na coluna Mês (AAAA-MM). Cada mês usa a versão mais recente
+# até ele; meses anteriores à primeira versão usam a primeira. O arquivo é relido sozinho
+# quando muda, sem novo deploy.
+# Ativo = não deixa o vendedor fora do plano de recuperação e dos destaques do mês
+# (call center, quem saiu), mas as vendas dele continuam no painel mensal.
+
+CAMINHO_EQUIPE = os.getenv(
+    "EQUIPE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "equipe.csv")
+)
+COLUNAS_METAS = ['Meta Cartões', 'Meta Saque', 'Início', 'Ativo']
+
+
+class Equipe:
+    def __init__(self, tabela):
+        tabela = tabela.assign(
+            Mês=tabela['Mês'].str.strip(),
+            Vendedor=tabela['Vendedor'].str.strip(),
+            Ativo=tabela['Ativo'].str.strip().str.lower().isin(['sim', 's', '1', 'true']),
+        )
+        self.meses = sorted(tabela['Mês'].unique())
+        # Uma tabela já indexada por Vendedor para cada versão
+        self._por_mes = {
+            mes: tabela.loc[tabela['Mês'] == mes, ['Vendedor'] + COLUNAS_METAS].set_index('Vendedor')
+            for mes in self.meses
+        }
+
+    def versao_do_mes(self, mes):
+        anteriores = [versao for versao in self.meses if versao <= mes]
+        return anteriores[-1] if anteriores else self.meses[0]
+
+    # Metas dos vendedores no mês (AAAA-MM), indexadas por Vendedor
+    def metas(self, mes):
+        return self._por_mes[self.versao_do_mes(mes)]
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_equipe(caminho, modificado_em):
+    tabela = pd.read_csv(
+        caminho, encoding='utf-8', keep_default_na=False,
+        dtype={'Mês': str, 'Vendedor': str, 'Início': str, 'Ativo': str, 'Meta Cartões': int, 'Meta Saque': int},
+    )
+    return Equipe(tabela)
+
+
+def obter_equipe(caminho=CAMINHO_EQUIPE):
+    return carregar_equipe(caminho, os.path.getmtime(caminho))
+
+
+def mes_de(inicio_mes):
+    return inicio_mes.strftime('%Y-%m')
+
+
+def metas_do_mes(inicio_mes):
+    return obter_equipe().metas(mes_de(inicio_mes))
+
+
+# Métricas por vendedor com as metas do mês, juntadas pelo índice: uma vez por versão dos dados e da equipe
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _juntar_metas(_metricas, versao, mes, caminho, modificado_em):
+    return _metricas.join(carregar_equipe(caminho, modificado_em).metas(mes), how='left')
+
+
+def metricas_com_metas(metricas, versao, inicio_mes, caminho=CAMINHO_EQUIPE):
+    return _juntar_metas(metricas, versao, mes_de(inicio_mes), caminho, os.path.getmtime(caminho))
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import filtros
+
+# Gráficos da página Indicadores.
+# As contagens de todos os gráficos saem dos códigos das categorias (um bincount
+# por coluna, sem value_counts nem groupby), e as figuras ficam memorizadas pela
+# versão dos dados e pelos filtros: um gráfico que não mudou não é montado de novo.
+
+COLUNAS_BARRAS = ['Produto', 'Origem', 'Espécie', 'Banco']
+TITULOS_BARRAS = {
+    'Produto': '<b>Distribuição por:  Produto</b>',
+    'Origem': '<b>                    Origem</b>',
+    'Espécie': '<b>                    Espécie</b>',
+    'Banco': '<b>                    Banco</b>',
+}
+CORES_BANCO = {
+    'BMG': '#FFC000',
+    'Pine': '#D9E1F2',
+    'FACTA': '#305496',
+}
+CORES_RESULTADO = {
+    'ACEITE': '#A9D08E',
+    'PEND. ACEITE': '#FF7D7D',
+}
+
+
+# Quantidade por categoria, só as que aparecem, em ordem crescente
+def contar_categoria(serie):
+    codigos = serie.cat.codes.to_numpy()
+    contagem = pd.Series(
+        np.bincount(codigos[codigos >= 0], minlength=len(serie.cat.categories)),
+        index=serie.cat.categories.astype(object),
+    )
+    return contagem[contagem > 0].sort_values(kind='stable')
+
+
+# Quantidade por Data x Resultado_Status (tabela cruzada dos dois códigos)
+def contar_resultado_por_data(vendas):
+    dias, datas = pd.factorize(vendas['Data'], sort=True)
+    resultado = vendas['Resultado_Status']
+    codigos = resultado.cat.codes.to_numpy()
+    validos = (dias >= 0) & (codigos >= 0)
+    total_resultados = len(resultado.cat.categories)
+
+    tabela = np.bincount(
+        dias[validos].astype(np.int64) * total_resultados + codigos[validos], minlength=len(datas) * total_resultados
+    ).reshape(len(datas), total_resultados)
+    linhas, colunas = np.nonzero(tabela)
+    return pd.DataFrame({
+        'Data': datas[linhas],
+        'Resultado_Status': resultado.cat.categories.astype(object)[colunas],
+        'Quantidade': tabela[linhas, colunas],
+    })
+
+
+def contar_graficos(vendas):
+    contagens = {coluna: contar_categoria(vendas[coluna]) for coluna in COLUNAS_BARRAS}
+    contagens['Data'] = contar_resultado_por_data(vendas)
+    return contagens
+
+
+def figura_barras(coluna, contagem):
+    if coluna == 'Banco':
+        cores = dict(color=contagem.index, color_discrete_map=CORES_BANCO)
+    else:
+        cores = dict(color_discrete_sequence=['#FFC000'] * len(contagem))
+    figura = px.bar(
+        x=contagem.values,
+        y=contagem.index,
+        orientation='h',
+        title=TITULOS_BARRAS[coluna],
+        template='plotly_white',
+        **cores
+    )
+    figura.update_layout(
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        xaxis=dict(showgrid=False, title='', showticklabels=False),
+        yaxis=dict(title='')
+    )
+    if coluna == 'Origem':
+        figura.update_layout(xaxis_title='Quantidade Vendas')
+    return figura
+
+
+def figura_resultado(data_resultado_count):
+    figura = px.bar(
+        data_resultado_count,
+        x='Data',
+        y='Quantidade',
+        color='Resultado_Status',
+        title='<b>Acompanhamento de aceite diário</b>',
+        template='plotly_white',
+        color_discrete_map=CORES_RESULTADO,
+    )
+    figura.update_layout(
+        xaxis=dict(
+            showgrid=False,
+            title='Quantidade de Vendas',
+            tickmode='array',
+            tickvals=data_resultado_count['Data'].unique(),
+            tickformat='%b %d'
+        ),
+        yaxis=dict(
+            title='',
+            showgrid=False,
+            zeroline=False,
+            gridcolor='rgba(0,0,0,0)'
+        ),
+        plot_bgcolor='rgba(0, 0, 0, 0)'
+    )
+    return figura
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _figuras_indicadores(_indice, versao, status, origem, resultado, data):
+    vendas = _indice.filtrar(status, origem, resultado, data)
+    if vendas.empty:
+        return None
+    contagens = contar_graficos(vendas)
+    figuras = {coluna: figura_barras(coluna, contagens[coluna]) for coluna in COLUNAS_BARRAS}
+    figuras['Data'] = figura_resultado(contagens['Data'])
+    return figuras
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _figura_aceite_diario(_indice, versao, resultado):
+    vendas = _indice.filtrar(resultado=resultado)
+    return figura_resultado(contar_resultado_por_data(vendas))
+
+
+# Figuras da página Indicadores para os filtros da sessão (None se nada passar no filtro)
+def figuras_indicadores(indice, versao, status, origem, resultado, data):
+    return _figuras_indicadores(
+        indice, versao, filtros.congelar(status), filtros.congelar(origem), filtros.congelar(resultado), filtros.congelar(data)
+    )
+
+
+def figura_aceite_diario(indice, versao, resultado):
+    return _figura_aceite_diario(indice, versao, filtros.congelar(resultado))
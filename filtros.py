@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Filtros da página Indicadores.
+# O índice é montado uma vez por versão dos dados: propostas ordenadas por Data
+# (o período vira uma busca binária) e códigos das categorias de Status, Origem e
+# Resultado_Status (cada multiselect vira uma tabela de consulta por código).
+
+COLUNAS_FILTRO = ['Status', 'Origem', 'Resultado_Status']
+
+
+def mascara_categorias(codigos, categorias, selecionados):
+    permitidos = np.zeros(len(categorias) + 1, dtype=bool)
+    indices = categorias.get_indexer(list(selecionados))
+    permitidos[indices[indices >= 0] + 1] = True
+    # código -1 (vazio) cai na posição 0, que nunca é permitida
+    return permitidos[codigos + 1]
+
+
+class IndiceFiltros:
+    def __init__(self, vendas):
+        ordem = np.argsort(vendas['Data'].to_numpy(), kind='stable')
+        self.vendas = vendas.iloc[ordem]
+        self.datas = self.vendas['Data'].to_numpy()
+        self.validas = int(np.count_nonzero(~np.isnat(self.datas)))
+        self.codigos = {coluna: self.vendas[coluna].cat.codes.to_numpy() for coluna in COLUNAS_FILTRO}
+        self.categorias = {coluna: self.vendas[coluna].cat.categories for coluna in COLUNAS_FILTRO}
+
+    # Primeira e última data válidas (NaT fica no fim da ordenação)
+    def periodo(self):
+        if not self.validas:
+            return None
+        return pd.Timestamp(self.datas[0]).date(), pd.Timestamp(self.datas[self.validas - 1]).date()
+
+    def _fatia(self, data_inicial, data_final):
+        if data_inicial is None:
+            return 0, self.validas
+        inicio = np.searchsorted(self.datas[:self.validas], pd.Timestamp(data_inicial).to_datetime64(), side='left')
+        fim = np.searchsorted(
+            self.datas[:self.validas], (pd.Timestamp(data_final) + pd.Timedelta(days=1)).to_datetime64(), side='left'
+        )
+        return inicio, max(inicio, fim)
+
+    # Filtros com valor None não são aplicados
+    def filtrar(self, status=None, origem=None, resultado=None, data=None):
+        inicio, fim = self._fatia(*(data or (None, None)))
+        mascara = np.ones(fim - inicio, dtype=bool)
+        for coluna, selecionados in zip(COLUNAS_FILTRO, (status, origem, resultado)):
+            if selecionados is not None:
+                mascara &= mascara_categorias(self.codigos[coluna][inicio:fim], self.categorias[coluna], selecionados)
+        if mascara.all():
+            return self.vendas.iloc[inicio:fim]
+        return self.vendas.iloc[inicio + np.flatnonzero(mascara)]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def indice_filtros(_vendas, versao):
+    return IndiceFiltros(_vendas)
+
+
+# Seleções dos widgets viram tuplas para servir de chave nos caches
+def congelar(valor):
+    return tuple(valor) if isinstance(valor, list) else valor
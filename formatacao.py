@@ -0,0 +1,25 @@
+import pandas as pd
+
+# Formatação de números no padrão brasileiro (1.234.567 e 85%).
+# Trabalha sobre a coluna inteira de uma vez; os painéis guardam os números
+# e só formatam na hora de exibir.
+
+SEPARADOR_MILHAR = r'(\d)(?=(\d{3})+$)'
+
+
+def _inteiros(valores):
+    numeros = pd.to_numeric(pd.Series(valores), errors='coerce')
+    return numeros.round().astype('Int64').astype('string')
+
+
+def formatar_numero(valores, prefixo=''):
+    texto = _inteiros(valores).str.replace(SEPARADOR_MILHAR, r'\1.', regex=True)
+    return (prefixo + texto).fillna('').astype(object)
+
+
+def formatar_percentual(valores):
+    return (_inteiros(valores) + '%').fillna('').astype(object)
+
+
+def formatar_valor(valor, prefixo=''):
+    return formatar_numero([valor], prefixo)[0]
@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from googleapiclient.errors import HttpError
+
+import ingestao
+import dados_planilha
+
+# Histórico mensal das propostas.
+# As abas de mês da planilha ("Fev", "Março", "Mar/25", "Mar 2025"...) são descobertas pela API
+# (spreadsheets.get); a mais recente é o mês corrente, lido ao vivo pelo cache de dados_planilha.
+# Os meses já fechados são baixados uma única vez, tratados e gravados em
+# DIRETORIO_HISTORICO/ano=AAAA/mes=MM/vendas.parquet, e daí em diante nunca mais são buscados.
+# Os painéis leem só as partições alcançadas pelo período selecionado.
+# A lista de abas também fica no disco (ARQUIVO_ABAS_PLANILHA): sem a API, a partida abre com os
+# snapshots de dados_planilha em vez de esperar pela lista de abas.
+
+DIRETORIO_HISTORICO = os.getenv("DIRETORIO_HISTORICO", "historico")
+# Força a aba do mês corrente (por padrão, a aba de mês mais recente da planilha)
+ABA_MES_ATUAL = os.getenv("ABA_MES_ATUAL")
+ARQUIVO_PARTICAO = 'vendas.parquet'
+ARQUIVO_MANIFESTO = 'abas.json'
+# Última lista de abas lida de cada planilha, para a partida não depender da API
+ARQUIVO_ABAS_PLANILHA = 'abas_planilha.json'
+
+NOMES_MESES = ['janeiro', 'fevereiro', 'marco', 'abril', 'maio', 'junho',
+               'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro']
+PADRAO_ABA = re.compile(r'^\s*([^\W\d_]{3,})\.?(?:[\s/_-]*(\d{4}|\d{2}))?\s*$')
+COLUNAS_HISTORICO = ingestao.COLUNAS_CATEGORICAS + ['Valor', 'Data', 'Perfil', 'Resultado_Status']
+
+
+# (mês, ano) de uma aba de mês, com ano None quando o nome não traz o ano; None se não for aba de mês
+def mes_da_aba(titulo):
+    encontrado = PADRAO_ABA.match(titulo)
+    if not encontrado:
+        return None
+    nome = encontrado.group(1).lower().replace('ç', 'c')
+    meses = [numero for numero, mes in enumerate(NOMES_MESES, 1) if mes.startswith(nome)]
+    if not meses:
+        return None
+    ano = encontrado.group(2)
+    if ano is not None:
+        ano = int(ano) + (2000 if len(ano) == 2 else 0)
+    return meses[0], ano
+
+
+# Sem ano no nome, a aba é do último mês com esse número até hoje (Dez em janeiro é do ano anterior)
+def ordem_aba(mes, ano, hoje=None):
+    hoje = hoje or datetime.date.today()
+    if ano is None:
+        ano = hoje.year if mes <= hoje.month else hoje.year - 1
+    return ano, mes
+
+
+def caminho_particao(diretorio, periodo):
+    return os.path.join(diretorio, f'ano={periodo.year}', f'mes={periodo.month:02d}', ARQUIVO_PARTICAO)
+
+
+def gravar_atomico(caminho, gravar):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    try:
+        gravar(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def ordenar_abas(titulos):
+    abas = [(titulo, *mes) for titulo in titulos if (mes := mes_da_aba(titulo))]
+    abas.sort(key=lambda aba: ordem_aba(aba[1], aba[2]))
+    return abas
+
+
+class HistoricoMensal:
+    def __init__(self, diretorio=DIRETORIO_HISTORICO):
+        self.diretorio = diretorio
+        self._abas = {}
+        self._relendo = set()
+        self._lock = threading.Lock()
+        self._lock_congelar = threading.Lock()
+
+    # Abas de mês em ordem cronológica: [(título, mês, ano)], relidas a cada TTL_MAXIMO.
+    # Na partida vale a lista gravada em disco na execução anterior (conferida logo em segundo plano);
+    # só sem ela a primeira leitura espera pela API. Depois disso a lista vencida continua valendo
+    # enquanto a nova é buscada em segundo plano (com as repetições do agendador).
+    def abas(self, spreadsheet_id, listar):
+        agora = datetime.datetime.now()
+        with self._lock:
+            abas, lidas_em = self._abas.get(spreadsheet_id, (None, None))
+            if abas is None:
+                titulos = self._ler_abas_planilha().get(str(spreadsheet_id))
+                if titulos is None:
+                    titulos = listar(spreadsheet_id)
+                    self._gravar_abas_planilha(spreadsheet_id, titulos)
+                    lidas_em = agora
+                else:
+                    lidas_em = agora - dados_planilha.TTL_MAXIMO
+                abas = ordenar_abas(titulos)
+                self._abas[spreadsheet_id] = (abas, lidas_em)
+            if agora - lidas_em >= dados_planilha.TTL_MAXIMO and spreadsheet_id not in self._relendo:
+                self._relendo.add(spreadsheet_id)
+                threading.Thread(
+                    target=self._reler_abas, args=(spreadsheet_id, listar), name="abas-planilha", daemon=True
+                ).start()
+        return abas
+
+    def _reler_abas(self, spreadsheet_id, listar):
+        titulos = None
+        try:
+            titulos = listar(spreadsheet_id)
+            abas, lidas_em = ordenar_abas(titulos), datetime.datetime.now()
+        except Exception as err:
+            # Mantém a lista anterior e tenta de novo depois da espera
+            print(err)
+            abas = self._abas[spreadsheet_id][0]
+            lidas_em = datetime.datetime.now() - dados_planilha.TTL_MAXIMO + dados_planilha.ESPERA_APOS_ERRO
+        with self._lock:
+            if titulos is not None:
+                self._gravar_abas_planilha(spreadsheet_id, titulos)
+            self._abas[spreadsheet_id] = (abas, lidas_em)
+            self._relendo.discard(spreadsheet_id)
+
+    def _ler_abas_planilha(self):
+        caminho = os.path.join(self.diretorio, ARQUIVO_ABAS_PLANILHA)
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+
+    def _gravar_abas_planilha(self, spreadsheet_id, titulos):
+        lista = self._ler_abas_planilha()
+        if lista.get(str(spreadsheet_id)) == list(titulos):
+            return
+        lista[str(spreadsheet_id)] = list(titulos)
+
+        def gravar(caminho):
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                json.dump(lista, arquivo, ensure_ascii=False, indent=2)
+        try:
+            gravar_atomico(os.path.join(self.diretorio, ARQUIVO_ABAS_PLANILHA), gravar)
+        except OSError as err:
+            print(err)
+
+    # (título, mês, ano) da aba do mês corrente, ou None se a planilha não tiver abas de mês
+    def aba_atual(self, spreadsheet_id, listar):
+        if ABA_MES_ATUAL:
+            return (ABA_MES_ATUAL, *(mes_da_aba(ABA_MES_ATUAL) or (None, None)))
+        abas = self.abas(spreadsheet_id, listar)
+        return abas[-1] if abas else None
+
+    def _ler_manifesto(self):
+        caminho = os.path.join(self.diretorio, ARQUIVO_MANIFESTO)
+        if not os.path.exists(caminho):
+            return {}
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+    def _gravar_manifesto(self, manifesto):
+        def gravar(caminho):
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+        gravar_atomico(os.path.join(self.diretorio, ARQUIVO_MANIFESTO), gravar)
+
+    # Baixa num único batchGet as abas de meses fechados que ainda não estão no disco.
+    # Uma aba congelada fica no manifesto (título -> AAAA-MM) e não é buscada de novo.
+    def congelar_fechados(self, spreadsheet_id, buscar, listar):
+        atual = self.aba_atual(spreadsheet_id, listar)
+        with self._lock_congelar:
+            manifesto = self._ler_manifesto()
+            pendentes = [
+                aba for aba in self.abas(spreadsheet_id, listar)
+                if aba[0] not in manifesto and (atual is None or aba[0] != atual[0])
+            ]
+            if not pendentes:
+                return
+            try:
+                lote = buscar(spreadsheet_id, [titulo for titulo, _, _ in pendentes])
+            except HttpError as err:
+                # O histórico fica com o que já está no disco; tenta de novo na próxima leitura
+                print(err)
+                return
+
+            for (titulo, mes, ano), valores in zip(pendentes, lote):
+                try:
+                    manifesto[titulo] = self._congelar(dados_planilha.para_dataframe(valores), mes, ano)
+                except Exception as err:
+                    print(err)
+                    continue
+                dados_planilha.cache.remover(spreadsheet_id, titulo)
+            self._gravar_manifesto(manifesto)
+
+    def _congelar(self, df, mes, ano):
+        # Aba de mês sem as colunas de propostas: fica registrada para não ser baixada de novo
+        if not set(ingestao.COLUNAS_CATEGORICAS + ['Valor', 'Data']) <= set(df.columns):
+            return None
+        vendas = ingestao.preparar_vendas(df, mes, ano)
+        periodo = ingestao.inicio_do_mes(vendas['Data'], mes, ano).to_period('M')
+        vendas = vendas[[coluna for coluna in COLUNAS_HISTORICO if coluna in vendas.columns]]
+        gravar_atomico(
+            caminho_particao(self.diretorio, periodo), lambda caminho: vendas.to_parquet(caminho, index=False)
+        )
+        return str(periodo)
+
+    # Meses gravados no disco, em ordem
+    def particoes(self):
+        periodos = []
+        if not os.path.isdir(self.diretorio):
+            return periodos
+        for pasta_ano in os.listdir(self.diretorio):
+            if not pasta_ano.startswith('ano='):
+                continue
+            for pasta_mes in os.listdir(os.path.join(self.diretorio, pasta_ano)):
+                if not pasta_mes.startswith('mes='):
+                    continue
+                periodo = pd.Period(year=int(pasta_ano[4:]), month=int(pasta_mes[4:]), freq='M')
+                if os.path.exists(caminho_particao(self.diretorio, periodo)):
+                    periodos.append(periodo)
+        return sorted(periodos)
+
+    # Meses fechados alcançados pelo período. Cada aba cobre do último dia do mês anterior (o estoque)
+    # ao fim do mês, então um período que começa no último dia do mês já fica com a aba seguinte.
+    def particoes_do_periodo(self, data_inicial, data_final, antes_de):
+        return tuple(
+            str(periodo) for periodo in self.particoes()
+            if periodo < antes_de
+            and ingestao.data_estoque(periodo.start_time).date() <= data_final
+            and periodo.end_time.date() > data_inicial
+        )
+
+    def carregar(self, periodo):
+        caminho = caminho_particao(self.diretorio, pd.Period(periodo, freq='M'))
+        return ler_particao(caminho, os.path.getmtime(caminho))
+
+
+@st.cache_resource(max_entries=24, show_spinner=False)
+def ler_particao(caminho, modificado_em):
+    return pd.read_parquet(caminho)
+
+
+mensal = HistoricoMensal()
+
+
+def aba_atual(spreadsheet_id, listar):
+    return mensal.aba_atual(spreadsheet_id, listar)
+
+
+def congelar_fechados(spreadsheet_id, buscar, listar):
+    mensal.congelar_fechados(spreadsheet_id, buscar, listar)
+
+
+def particoes_do_periodo(data_inicial, data_final, inicio_atual):
+    return mensal.particoes_do_periodo(data_inicial, data_final, inicio_atual.to_period('M'))
+
+
+# Propostas válidas de cada mês: [(período, vendas)], do mais antigo ao corrente.
+# O estoque que um mês herda do anterior só entra quando o mês anterior não está junto,
+# para a mesma proposta não ser contada duas vezes.
+def vendas_por_mes(atual, inicio_atual, particoes):
+    meses = [(pd.Period(periodo, freq='M'), ingestao.selecionar_validas(mensal.carregar(periodo))) for periodo in particoes]
+    meses.append((inicio_atual.to_period('M'), atual))
+    meses.sort(key=lambda mes: mes[0])
+    incluidos = {periodo for periodo, _ in meses}
+    return [
+        (periodo, vendas[vendas['Data'] >= periodo.start_time] if periodo - 1 in incluidos else vendas)
+        for periodo, vendas in meses
+    ]
+
+
+# Mês corrente mais os meses fechados do período, com as categorias refeitas sobre o conjunto
+@st.cache_resource(max_entries=4, show_spinner=False)
+def vendas_com_historico(_atual, versao, inicio_atual, particoes):
+    vendas = pd.concat([vendas for _, vendas in vendas_por_mes(_atual, inicio_atual, particoes)], ignore_index=True)
+    colunas = ingestao.COLUNAS_CATEGORICAS + [coluna for coluna in ingestao.COLUNAS_CATEGORICAS_OPCIONAIS if coluna in vendas.columns]
+    categorias = {coluna: vendas[coluna].astype('category') for coluna in colunas}
+    categorias['Resultado_Status'] = pd.Categorical(vendas['Resultado_Status'], categories=ingestao.RESULTADOS)
+    return vendas.assign(**categorias)
+
+
+# Propostas, pagas e valor pago por mês, mais o acumulado do ano do mês corrente
+@st.cache_resource(max_entries=4, show_spinner=False)
+def resumo_mensal(_atual, versao, inicio_atual, particoes):
+    linhas = []
+    for periodo, vendas in vendas_por_mes(_atual, inicio_atual, particoes):
+        pago = vendas['Status'] == 'PAGO'
+        linhas.append((periodo, len(vendas), int(pago.sum()), vendas.loc[pago, 'Valor'].to_numpy().sum(dtype=np.float64)))
+    resumo = pd.DataFrame(linhas, columns=['Período', 'Propostas', 'Pagas', 'Valor Pago'])
+
+    ano = inicio_atual.year
+    acumulado = resumo[[periodo.year == ano for periodo in resumo['Período']]].drop(columns='Período').sum()
+    resumo['Período'] = [periodo.strftime('%m/%Y') for periodo in resumo['Período']]
+    resumo.loc[len(resumo)] = [f'Acumulado {ano}', *acumulado]
+    return resumo
@@ -0,0 +1,82 @@
+import os
+import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Tratamento das propostas lidas da aba do mês.
+# Converte de uma vez só as colunas de texto da planilha nos tipos usados pelos painéis,
+# num modelo compacto: categorias para as colunas de poucos valores, float32 para o valor
+# (exato até o centavo para propostas de até R$ 100 mil; as somas são feitas em float64)
+# e texto do Arrow para as colunas livres, em vez de um objeto str do Python por célula.
+
+STATUS_ACEITE = ['PAGO', 'AG. INSS', 'BLOQUEADO']
+STATUS_VALIDOS = STATUS_ACEITE + ['PENDENTE', 'CANCELADO']
+RESULTADOS = ['ACEITE', 'PEND. ACEITE']
+COLUNAS_CATEGORICAS = ['Status', 'Produto', 'Origem', 'Vendedor', 'Banco', 'Espécie']
+# Colunas de poucos valores que nem toda aba traz
+COLUNAS_CATEGORICAS_OPCIONAIS = ['Perfil']
+# Colunas da planilha que entram no tratamento, e daí nas agregações e nos painéis
+COLUNAS_TRATADAS = ['Valor', 'Data'] + COLUNAS_CATEGORICAS + COLUNAS_CATEGORICAS_OPCIONAIS
+TIPO_TEXTO = 'string[pyarrow]'
+
+FORMATO_DATA = os.getenv("FORMATO_DATA", "%d/%m/%Y")
+
+# "R$ 1.234,56" -> "1234.56" numa única passada
+TABELA_VALOR = str.maketrans({'R': None, '$': None, ' ': None, '\xa0': None, '.': None, ',': '.'})
+
+
+def converter_valor(serie):
+    return pd.to_numeric(serie.str.translate(TABELA_VALOR), errors='coerce').fillna(0).astype(np.float32)
+
+
+# Primeiro dia do mês da aba; sem ano no nome da aba, vale o ano mais comum entre as datas desse mês
+def inicio_do_mes(datas, mes, ano=None):
+    if ano is None:
+        anos = datas.dt.year[datas.dt.month == mes]
+        ano = int(anos.mode()[0]) if not anos.empty else datetime.date.today().year
+    return pd.Timestamp(year=ano, month=mes, day=1)
+
+
+# Propostas do estoque do mês anterior entram com a data do último dia desse mês
+def data_estoque(inicio_mes):
+    return inicio_mes - pd.Timedelta(days=1)
+
+
+def converter_data(serie, mes=None, ano=None):
+    datas = pd.to_datetime(serie, format=FORMATO_DATA, errors='coerce')
+    if mes is None:
+        return datas
+    estoque = data_estoque(inicio_do_mes(datas, mes, ano))
+    return datas.mask(datas < estoque, estoque)
+
+
+def converter_resultado(status):
+    return pd.Categorical(
+        np.where(status.isin(STATUS_ACEITE), RESULTADOS[0], RESULTADOS[1]), categories=RESULTADOS
+    )
+
+
+def preparar_vendas(df, mes=None, ano=None):
+    colunas = {
+        'Valor': converter_valor(df['Valor']),
+        'Data': converter_data(df['Data'], mes, ano),
+        'Resultado_Status': converter_resultado(df['Status']),
+    }
+    for coluna in COLUNAS_CATEGORICAS + [coluna for coluna in COLUNAS_CATEGORICAS_OPCIONAIS if coluna in df.columns]:
+        colunas[coluna] = df[coluna].astype('category')
+    for coluna in df.columns:
+        if coluna not in colunas and df[coluna].dtype == object:
+            colunas[coluna] = df[coluna].astype(TIPO_TEXTO)
+    return df.assign(**colunas)
+
+
+# Tratada uma vez por versão dos dados e compartilhada entre as sessões
+@st.cache_resource(max_entries=2, show_spinner=False)
+def vendas_tratadas(_df, versao, mes=None, ano=None):
+    return preparar_vendas(_df, mes, ano)
+
+
+def selecionar_validas(vendas):
+    return vendas[vendas['Status'].isin(STATUS_VALIDOS)]
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import datetime
+import threading
+import contextlib
+import collections
+
+import numpy as np
+import pandas as pd
+
+# Medição das etapas do painel: chamadas à API, produtos de dados (ingestão e agregações),
+# desenho das seções, serialização dos gráficos e a reexecução inteira do script.
+# Cada etapa guarda as últimas AMOSTRAS_POR_ETAPA medições (tempo de parede, linhas processadas
+# e variação da memória do processo), de onde saem os percentis da página de diagnóstico.
+# Exportação opcional: cada medição numa linha de INSTRUMENTACAO_JSONL, e o texto no formato
+# do Prometheus regravado em INSTRUMENTACAO_PROMETHEUS ao fim de cada reexecução
+# (para o coletor de arquivos de texto do node_exporter).
+
+AMOSTRAS_POR_ETAPA = int(os.getenv("AMOSTRAS_POR_ETAPA", "500"))
+EXPORTAR_JSONL = os.getenv("INSTRUMENTACAO_JSONL")
+EXPORTAR_PROMETHEUS = os.getenv("INSTRUMENTACAO_PROMETHEUS")
+PERCENTIS = [50, 90, 99]
+MB = 1024 * 1024
+
+
+# Memória residente do processo em bytes; None fora do Linux
+def memoria_processo():
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def memoria_dataframe(dados):
+    uso = dados.memory_usage(deep=True)
+    return int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+
+
+def contar_linhas(resultado):
+    if isinstance(resultado, (pd.DataFrame, pd.Series)):
+        return len(resultado)
+    return None
+
+
+class Instrumentacao:
+    def __init__(self, amostras=AMOSTRAS_POR_ETAPA, exportar_jsonl=EXPORTAR_JSONL):
+        self.amostras = amostras
+        self.exportar_jsonl = exportar_jsonl
+        self._medicoes = {}
+        self._totais = collections.defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+
+    # Mede o bloco; quem mede pode informar as linhas processadas em medicao['linhas']
+    @contextlib.contextmanager
+    def medir(self, etapa, linhas=None):
+        medicao = {'linhas': linhas}
+        memoria_inicial = memoria_processo()
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            segundos = time.perf_counter() - inicio
+            memoria_final = memoria_processo()
+            memoria = memoria_final - memoria_inicial if memoria_final is not None and memoria_inicial is not None else None
+            self.registrar(etapa, segundos, medicao['linhas'], memoria)
+
+    def registrar(self, etapa, segundos, linhas=None, memoria=None):
+        momento = datetime.datetime.now()
+        with self._lock:
+            if etapa not in self._medicoes:
+                self._medicoes[etapa] = collections.deque(maxlen=self.amostras)
+            self._medicoes[etapa].append((momento, segundos, linhas, memoria))
+            total = self._totais[etapa]
+            total[0] += 1
+            total[1] += segundos
+        if self.exportar_jsonl:
+            self._gravar_jsonl(momento, etapa, segundos, linhas, memoria)
+
+    def _gravar_jsonl(self, momento, etapa, segundos, linhas, memoria):
+        linha = json.dumps({
+            'momento': momento.isoformat(timespec='milliseconds'), 'etapa': etapa, 'segundos': round(segundos, 6),
+            'linhas': linhas, 'memoria_bytes': memoria, 'pid': os.getpid(),
+        }, ensure_ascii=False)
+        try:
+            with self._lock_arquivo, open(self.exportar_jsonl, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha + '\n')
+        except OSError as err:
+            print(err)
+
+    def _copiar(self):
+        with self._lock:
+            return {etapa: list(medicoes) for etapa, medicoes in self._medicoes.items()}, \
+                {etapa: tuple(total) for etapa, total in self._totais.items()}
+
+    # Uma linha por etapa, com os percentis das medições recentes em milissegundos
+    def resumo(self):
+        medicoes, totais = self._copiar()
+        linhas = []
+        for etapa in sorted(medicoes):
+            tempos = np.array([segundos for _, segundos, _, _ in medicoes[etapa]]) * 1000
+            contagens = [quantidade for _, _, quantidade, _ in medicoes[etapa] if quantidade is not None]
+            memorias = [memoria for _, _, _, memoria in medicoes[etapa] if memoria is not None]
+            linha = {'Etapa': etapa, 'Execuções': totais[etapa][0]}
+            linha.update({f'p{percentil} (ms)': np.percentile(tempos, percentil) for percentil in PERCENTIS})
+            linha['Máx. (ms)'] = tempos.max()
+            linha['Linhas'] = contagens[-1] if contagens else None
+            linha['Memória média (MB)'] = np.mean(memorias) / MB if memorias else None
+            linha['Última'] = medicoes[etapa][-1][0].strftime('%H:%M:%S')
+            linhas.append(linha)
+        return pd.DataFrame(linhas)
+
+    def jsonl(self):
+        medicoes, _ = self._copiar()
+        return ''.join(
+            json.dumps({'momento': momento.isoformat(timespec='milliseconds'), 'etapa': etapa, 'segundos': round(segundos, 6),
+                        'linhas': linhas, 'memoria_bytes': memoria}, ensure_ascii=False) + '\n'
+            for etapa, amostras in medicoes.items() for momento, segundos, linhas, memoria in amostras
+        )
+
+    # Texto no formato de exposição do Prometheus: etapas como summary, mais a memória e,
+    # quando informadas, as métricas do agendador de chamadas à API
+    def prometheus(self, api=None):
+        medicoes, totais = self._copiar()
+        linhas = [
+            '# HELP painel_etapa_segundos Tempo de parede das etapas do painel',
+            '# TYPE painel_etapa_segundos summary',
+        ]
+        for etapa in sorted(medicoes):
+            rotulo = etapa.replace('\\', '\\\\').replace('"', '\\"')
+            tempos = np.array([segundos for _, segundos, _, _ in medicoes[etapa]])
+            for percentil in PERCENTIS:
+                linhas.append(f'painel_etapa_segundos{{etapa="{rotulo}",quantile="{percentil / 100}"}} {np.percentile(tempos, percentil):.6f}')
+            linhas.append(f'painel_etapa_segundos_sum{{etapa="{rotulo}"}} {totais[etapa][1]:.6f}')
+            linhas.append(f'painel_etapa_segundos_count{{etapa="{rotulo}"}} {totais[etapa][0]}')
+
+        memoria = memoria_processo()
+        if memoria is not None:
+            linhas += ['# TYPE painel_memoria_residente_bytes gauge', f'painel_memoria_residente_bytes {memoria}']
+
+        if api is None:
+            return '\n'.join(linhas) + '\n'
+        for nome in ['chamadas', 'coalescidas', 'tentativas', 'sucessos', 'falhas', 'repeticoes', 'esperas_cota']:
+            linhas += [f'# TYPE painel_api_{nome}_total counter', f'painel_api_{nome}_total {api[nome]}']
+        linhas += [
+            '# TYPE painel_api_cota_usada gauge', f"painel_api_cota_usada {api['cota_usada_no_minuto']}",
+            '# TYPE painel_api_cota_por_minuto gauge', f"painel_api_cota_por_minuto {api['cota_por_minuto']}",
+        ]
+        if api['erros']:
+            linhas.append('# TYPE painel_api_erros_total counter')
+        for status, quantidade in api['erros'].items():
+            linhas.append(f'painel_api_erros_total{{status="{status}"}} {quantidade}')
+        return '\n'.join(linhas) + '\n'
+
+    def exportar(self, api=None, caminho=EXPORTAR_PROMETHEUS):
+        if not caminho:
+            return
+        texto = self.prometheus(api)
+        temporario = f'{caminho}.{os.getpid()}.tmp'
+        try:
+            with self._lock_arquivo:
+                with open(temporario, 'w', encoding='utf-8') as arquivo:
+                    arquivo.write(texto)
+                os.replace(temporario, caminho)
+        except OSError as err:
+            print(err)
+
+
+instrumentacao = Instrumentacao()
+
+
+def medir(etapa, linhas=None):
+    return instrumentacao.medir(etapa, linhas)
+
+
+def registrar(etapa, segundos, linhas=None, memoria=None):
+    instrumentacao.registrar(etapa, segundos, linhas, memoria)
+
+
+def resumo():
+    return instrumentacao.resumo()
+
+
+def jsonl():
+    return instrumentacao.jsonl()
+
+
+def prometheus(api=None):
+    return instrumentacao.prometheus(api)
+
+
+def exportar(api=None):
+    instrumentacao.exportar(api)
@@ -0,0 +1,101 @@
+import os
+import itertools
+
+import pandas as pd
+import pyarrow as pa
+
+# Leitura das linhas devolvidas pela API (values.get / values.batchGet) em colunas de texto do Arrow.
+# A API omite as células vazias do fim de cada linha, então as linhas chegam com tamanhos diferentes.
+# As linhas são lidas em lotes de TAMANHO_LOTE_LEITURA: cada lote é completado e transposto
+# (itertools.zip_longest, em C) e vira um pedaço de array do Arrow por coluna. Não se monta uma
+# segunda lista de listas nem um DataFrame de objetos: a memória extra da leitura fica limitada
+# a um lote, qualquer que seja o tamanho da aba.
+# Linhas fora do formato (mais células que o cabeçalho, linhas vazias no meio da aba, células
+# que não são texto) entram no RelatorioLeitura, com as posições na planilha.
+
+TAMANHO_LOTE_LEITURA = int(os.getenv("TAMANHO_LOTE_LEITURA", "50000"))
+EXEMPLOS_RELATORIO = 20
+TIPO_TEXTO = pd.StringDtype('pyarrow')
+
+
+class RelatorioLeitura:
+    def __init__(self, primeira_linha=2):
+        # Número, na planilha, da primeira linha de dados (a linha 1 é o cabeçalho)
+        self.primeira_linha = primeira_linha
+        self.linhas = 0
+        self.curtas = 0
+        self.longas = []
+        self.vazias = []
+        self.colunas_nao_texto = set()
+        self.colunas_duplicadas = []
+
+    @property
+    def malformadas(self):
+        return len(self.longas) + len(self.vazias)
+
+    def registrar_longa(self, posicao, celulas):
+        self.longas.append((self.primeira_linha + posicao, celulas))
+
+    def registrar_vazia(self, posicao):
+        self.vazias.append(self.primeira_linha + posicao)
+
+    def resumo(self):
+        partes = [f'{self.linhas} linhas, {self.curtas} completadas com células vazias']
+        if self.longas:
+            exemplos = ', '.join(f'{linha} ({celulas} células)' for linha, celulas in self.longas[:EXEMPLOS_RELATORIO])
+            partes.append(f'{len(self.longas)} com mais células que o cabeçalho, cortadas: {exemplos}')
+        if self.vazias:
+            exemplos = ', '.join(str(linha) for linha in self.vazias[:EXEMPLOS_RELATORIO])
+            partes.append(f'{len(self.vazias)} vazias: {exemplos}')
+        if self.colunas_nao_texto:
+            partes.append(f"colunas com células que não são texto: {', '.join(sorted(self.colunas_nao_texto))}")
+        if self.colunas_duplicadas:
+            partes.append(f"colunas repetidas no cabeçalho: {', '.join(self.colunas_duplicadas)}")
+        return '; '.join(partes)
+
+
+def _coluna_arrow(valores, nome, relatorio):
+    try:
+        return pa.array(valores, type=pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Número ou booleano no meio do texto (valueRenderOption sem formatação, por exemplo)
+        relatorio.colunas_nao_texto.add(str(nome))
+        return pa.array([None if valor is None else str(valor) for valor in valores], type=pa.string())
+
+
+def _ler_lote(lote, inicio, largura, relatorio):
+    tamanhos = list(map(len, lote))
+    maior = max(tamanhos)
+    if maior > largura:
+        for posicao, tamanho in enumerate(tamanhos):
+            if tamanho > largura:
+                relatorio.registrar_longa(inicio + posicao, tamanho)
+    if min(tamanhos) < largura:
+        relatorio.curtas += sum(1 for tamanho in tamanhos if tamanho < largura)
+        if min(tamanhos) == 0:
+            for posicao, tamanho in enumerate(tamanhos):
+                if not tamanho:
+                    relatorio.registrar_vazia(inicio + posicao)
+    # Completa as linhas curtas com None; um lote só de linhas vazias não tem o que transpor
+    colunas = list(itertools.zip_longest(*lote)) if maior else []
+    return [colunas[indice] if indice < len(colunas) else [None] * len(lote) for indice in range(largura)]
+
+
+# DataFrame com uma coluna de texto do Arrow por coluna do cabeçalho
+def ler_linhas(cabecalho, linhas, relatorio=None, tamanho_lote=TAMANHO_LOTE_LEITURA):
+    relatorio = relatorio if relatorio is not None else RelatorioLeitura()
+    largura = len(cabecalho)
+    relatorio.linhas += len(linhas)
+    relatorio.colunas_duplicadas = sorted({str(nome) for nome in cabecalho if cabecalho.count(nome) > 1})
+
+    pedacos = [[] for _ in range(largura)]
+    for inicio in range(0, len(linhas), tamanho_lote):
+        lote = linhas[inicio:inicio + tamanho_lote]
+        for indice, valores in enumerate(_ler_lote(lote, inicio, largura, relatorio)):
+            pedacos[indice].append(_coluna_arrow(valores, cabecalho[indice], relatorio))
+
+    colunas = [
+        pd.arrays.ArrowStringArray(pa.chunked_array(pedacos[indice], type=pa.string()))
+        for indice in range(largura)
+    ]
+    return pd.DataFrame(dict(zip(range(largura), colunas))).set_axis(cabecalho, axis=1)
@@ -0,0 +1,90 @@
+import os
+import threading
+import concurrent.futures
+
+import streamlit as st
+
+import instrumentacao
+
+# Execução preguiçosa das páginas do painel.
+# Cada produto de dados (vendas tratadas, cubo, métricas, projeção de comissões...) é
+# registrado com as dependências dele e só é calculado quando alguma página pede.
+# Os produtos pertencem à versão dos dados (servico_dados.py), não à sessão: o resultado é
+# compartilhado por todas as sessões que mostram a mesma versão.
+# Os produtos independentes rodam em paralelo num pool de threads do processo, e as seções
+# da página são reservadas com placeholders e desenhadas conforme os dados ficam prontos.
+
+TRABALHADORES_PAINEL = int(os.getenv("TRABALHADORES_PAINEL", "4"))
+
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=TRABALHADORES_PAINEL, thread_name_prefix='painel')
+
+
+class ProdutosDados:
+    def __init__(self):
+        self._receitas = {}
+        self._futuros = {}
+        self._lock = threading.RLock()
+
+    def registrar(self, nome, calcular, *dependencias):
+        self._receitas[nome] = (calcular, dependencias)
+
+    # Agenda o produto depois das dependências; como o pool atende em ordem de chegada,
+    # as dependências já estão rodando quando o produto começa a esperar por elas
+    def _agendar(self, nome):
+        with self._lock:
+            if nome not in self._futuros:
+                calcular, dependencias = self._receitas[nome]
+                futuros = [self._agendar(dependencia) for dependencia in dependencias]
+                self._futuros[nome] = _pool.submit(self._executar, nome, calcular, futuros)
+            return self._futuros[nome]
+
+    @staticmethod
+    def _executar(nome, calcular, futuros):
+        argumentos = [futuro.result() for futuro in futuros]
+        with instrumentacao.medir(f'produto:{nome}') as medicao:
+            resultado = calcular(*argumentos)
+            medicao['linhas'] = instrumentacao.contar_linhas(resultado)
+        return resultado
+
+    def preparar(self, *nomes):
+        return [self._agendar(nome) for nome in nomes]
+
+    def __getitem__(self, nome):
+        return self._agendar(nome).result()
+
+    # Produtos já calculados, sem disparar os que ainda não foram pedidos
+    def prontos(self):
+        with self._lock:
+            futuros = dict(self._futuros)
+        return {
+            nome: futuro.result() for nome, futuro in futuros.items()
+            if futuro.done() and futuro.exception() is None
+        }
+
+
+# Reserva o lugar de uma seção na ordem da página e já agenda os produtos de que ela precisa
+def reservar(produtos, desenhar, *nomes):
+    lugar = st.empty()
+    return lugar, desenhar, produtos.preparar(*nomes)
+
+
+# Desenha as seções reservadas: primeiro as que já têm os dados, depois cada uma assim que os dados ficam prontos
+def concluir(secoes):
+    pendentes = list(secoes)
+    for lugar, _, futuros in pendentes:
+        if not all(futuro.done() for futuro in futuros):
+            lugar.caption('Carregando...')
+
+    while pendentes:
+        prontas = [secao for secao in pendentes if all(futuro.done() for futuro in secao[2])]
+        if not prontas:
+            concurrent.futures.wait(
+                [futuro for _, _, futuros in pendentes for futuro in futuros if not futuro.done()],
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            continue
+        for secao in prontas:
+            pendentes.remove(secao)
+            lugar, desenhar, _ = secao
+            with lugar.container(), instrumentacao.medir(f'secao:{desenhar.__name__}'):
+                desenhar()
@@ -3,21 +3,32 @@ import os
 import json
 from dotenv import load_dotenv
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-import pickle
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from streamlit_option_menu import option_menu
-from numerize.numerize import numerize
 import numpy as np
 import datetime
 
+import agendador
+import credenciais
+import dados_planilha
+import equipe
+import servico_dados
+import ingestao
+import agregacoes
+import formatacao
+import filtros
+import figuras
+import historico
+import instrumentacao
+import paginas
+
+# Os painéis compartilham o mesmo DataFrame tratado; copy-on-write evita alterações acidentais nele
+pd.options.mode.copy_on_write = True
+
 dotenv_path = os.path.join(os.getcwd(), ".env")
 load_dotenv(dotenv_path, override=True)
 
@@ -25,6 +36,8 @@ SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 SAMPLE_SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 CLIENT_SECRETS_PATH = os.getenv("CLIENT_SECRETS_PATH", ".secrets/client_secrets.json")
 TOKEN_PATH = 'token.json'
+# Intervalo em que cada sessão aberta confere se há uma versão nova dos dados
+INTERVALO_VERIFICACAO = int(os.getenv("VERIFICAR_ATUALIZACAO_SEGUNDOS", "30"))
 
 if not os.path.exists(CLIENT_SECRETS_PATH):
     st.error("Erro: CLIENT_SECRETS_PATH não foi encontrado.")
@@ -33,201 +46,88 @@ else:
     with open(CLIENT_SECRETS_PATH, "r") as f:
         CLIENT_SECRETS_JSON = f.read()
 
+# Credenciais e clientes do Sheets ficam em memória para o processo todo (credenciais.py)
+gerenciador_credenciais = credenciais.obter_gerenciador(TOKEN_PATH, SCOPES)
+
 # Função para obter credenciais do Google
 
 def obter_credenciais():
-    creds = None
-    
-    # Verifica se o token já existe e está válido
-    if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    # Token em memória, já renovado se tiver vencido
+    creds = gerenciador_credenciais.obter()
     
     # Se não houver credenciais válidas, inicia a autenticação
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            try:
-                client_secrets = json.loads(CLIENT_SECRETS_JSON)
-            except json.JSONDecodeError:
-                st.error("Erro ao carregar as credenciais do Google.")
-                return None
-            
-            flow = InstalledAppFlow.from_client_config(client_secrets, SCOPES)
-            creds = flow.run_local_server(port=0)
-            
-            # Salva as credenciais obtidas
-            with open(TOKEN_PATH, "w") as token:
-                token.write(creds.to_json())
+    if not creds:
+        try:
+            client_secrets = json.loads(CLIENT_SECRETS_JSON)
+        except json.JSONDecodeError:
+            st.error("Erro ao carregar as credenciais do Google.")
+            return None
+        
+        flow = InstalledAppFlow.from_client_config(client_secrets, SCOPES)
+        creds = flow.run_local_server(port=0)
+        
+        # Salva as credenciais obtidas
+        gerenciador_credenciais.definir(creds)
     
     return creds
 
+# Serialização do gráfico para o navegador, medida à parte do cálculo das figuras
+def mostrar_grafico(fig):
+    with instrumentacao.medir('plotly'):
+        st.plotly_chart(fig, use_container_width=True)
+
 def main():
     creds = obter_credenciais()
     if not creds:
         return
     
-    try:
-        service = build("sheets", "v4", credentials=creds)
-        sheet = service.spreadsheets()
-
-        # Buscar valores na planilha
-        result_mes = sheet.values().get(
-            spreadsheetId=SAMPLE_SPREADSHEET_ID, 
-            range='Fev'
-        ).execute()
-        valores_mes = result_mes.get("values", [])
-
-        result_diario = sheet.values().get(
-            spreadsheetId=SAMPLE_SPREADSHEET_ID, 
-            range='DIÁRIO!C7:K21'
-        ).execute()
-        valores_diario = result_diario.get("values", [])
-
-        if valores_mes:
-            st.cache_data.clear()
-            df = pd.DataFrame(valores_mes[1:], columns=valores_mes[0])
-            print("Colunas disponíveis:", df.columns.tolist())
-
-            dias_passados = int(df.loc[0, 'Ajuda'])
-            dias_uteis = int(df.loc[1, 'Ajuda'])
-            dias_restante = int(df.loc[2, 'Ajuda'])
-            df['Resultado_Status'] = df['Status'].apply(lambda x: 'ACEITE' if x in ['PAGO', 'AG. INSS', 'BLOQUEADO'] else 'PEND. ACEITE')
-
-            df_selection = df[df["Status"].isin(["PAGO", "AG. INSS", "BLOQUEADO", "PENDENTE", "CANCELADO"])]
-            df_selection['Valor'] = df_selection['Valor'].str.replace('R$ ', '').str.replace('.', '').str.replace(',', '.').str.replace(' ', '')
-            df_selection['Valor'] = pd.to_numeric(df_selection['Valor'], errors='coerce')
-            df_selection['Valor'] = df_selection['Valor'].fillna(0)
-            df_selection['Data'] = pd.to_datetime(df_selection['Data'], dayfirst=True, errors='coerce')
-            data_corte = pd.to_datetime('2025-01-30')
-            df_selection.loc[df_selection['Data'] <= data_corte, 'Data'] = pd.to_datetime('2025-01-31')
-            data_min = df_selection['Data'].min().date()
-            data_max = df_selection['Data'].max().date()
-
-            pago_qtde_sem_saque = ((df_selection['Status'] == 'PAGO') & (df_selection['Produto'] == 'Cartão sem Saque')).sum()
-            pago_qtde_com_saque = ((df_selection['Status'] == 'PAGO') & (df_selection['Produto'] == 'Cartão com Saque')).sum()
-            ag_qtde_sem_saque = ((df_selection['Status'] == 'AG. INSS') & (df_selection['Produto'] == 'Cartão sem Saque')).sum()
-            ag_qtde_com_saque = ((df_selection['Status'] == 'AG. INSS') & (df_selection['Produto'] == 'Cartão com Saque')).sum()
-            bloqueado_qtde_sem_saque = ((df_selection['Status'] == 'BLOQUEADO') & (df_selection['Produto'] == 'Cartão sem Saque')).sum()
-            bloqueado_qtde_com_saque = ((df_selection['Status'] == 'BLOQUEADO') & (df_selection['Produto'] == 'Cartão com Saque')).sum()       
-
-            soma_cartao_pago = df_selection[(df_selection['Status'] == 'PAGO') & (df_selection['Produto'] == 'Cartão com Saque')]['Valor'].sum()
-            soma_cartao_aguardando = df_selection[(df_selection['Status'] == 'PAGO') & (df_selection['Produto'] == 'Cartão com Saque')]['Valor'].sum()
-            soma_cartao_bloqueado = df_selection[(df_selection['Status'] == 'BLOQUEADO') & (df_selection['Produto'] == 'Cartão com Saque')]['Valor'].sum()
-            soma_novo_pago = df_selection[(df_selection['Status'] == 'PAGO_') & (df_selection['Produto'] == 'Margem Livre')]['Valor'].sum()
-            soma_saque_pago = df_selection[(df_selection['Status'] == 'PAGO_') & (df_selection['Produto'] == 'Saque Complementar')]['Valor'].sum()
-            soma_novo_aguardando = df_selection[(df_selection['Status'] == 'AG. INSS_') & (df_selection['Produto'] == 'Margem Livre')]['Valor'].sum()
-            soma_saque_aguardando = df_selection[(df_selection['Status'] == 'AG. INSS_') & (df_selection['Produto'] == 'Saque Complementar')]['Valor'].sum()
-
-            total_emitido = pago_qtde_sem_saque + pago_qtde_com_saque
-            total_saque_autorizado = soma_cartao_pago
-            total_saque_complementar = soma_saque_pago
-            total_novo = soma_novo_pago
-
-            cms_total_emitido = total_emitido * 300
-            cms_total_saque_autorizado = total_saque_autorizado * 0.1
-            cms_total_saque_complementar = total_saque_complementar * 0.1
-            cms_total_novo = total_novo * 0.07
-            cms_subtotal1 = cms_total_emitido+ cms_total_saque_autorizado + cms_total_saque_complementar + cms_total_novo
-
-            aguardando_emissao = ag_qtde_sem_saque + ag_qtde_com_saque
-            aguardando_saque_autorizado = soma_cartao_aguardando
-            aguardando_desbloquear_emissao = bloqueado_qtde_sem_saque + bloqueado_qtde_com_saque
-            aguardando_desbloquear_saque_autorizado = soma_cartao_bloqueado
-            aguardando_saque_complementar = soma_saque_aguardando
-            aguardando_novo = soma_novo_aguardando
-            expectativa_ativacao = total_emitido * 0.2
-
-            cms_aguardando_emissao = aguardando_emissao * 300
-            cms_aguardando_saque_autorizado = aguardando_saque_autorizado * 0.1
-            cms_aguardando_desbloquear_emissao = aguardando_desbloquear_emissao * 300
-            cms_aguardando_desbloquear_saque_autorizado = aguardando_desbloquear_saque_autorizado * 0.1
-            cms_aguardando_saque_complementar = aguardando_saque_complementar * 0.1
-            cms_aguardando_novo = aguardando_novo * 0.07
-            cms_expectativa_ativacao = expectativa_ativacao * 100
-            cms_subtotal2 = (
-                cms_aguardando_emissao + cms_aguardando_saque_autorizado +
-                cms_aguardando_desbloquear_emissao + cms_aguardando_desbloquear_saque_autorizado +
-                cms_aguardando_saque_complementar + cms_aguardando_novo + cms_expectativa_ativacao
-            )
-            total = cms_subtotal1 + cms_subtotal2
-
-            projecao_receita_bruta = total
-            imposto = total * -0.16
-            premiacao_funcionario = total * -0.15 
-            campanha = -500
-            despesas_adm = -18535
-            despesas_pessoal = -51782
-            desbloqueio_beneficio = -1805 -2436 -570 -285 -522 -7650
-
-            projecao_receita_liquida = (
-                total + imposto + premiacao_funcionario + campanha +
-                despesas_adm + despesas_pessoal + desbloqueio_beneficio
-            )
-            projecao_receita_liquida = f'{projecao_receita_liquida:,.0f}'.replace(",", "X").replace(".", ",").replace("X", ".")
+    # As chamadas passam pelo agendador: unificação de chamadas iguais, cota por minuto e repetição
+    def buscar_intervalos(spreadsheet_id, intervalos):
+        def buscar():
+            with gerenciador_credenciais.cliente() as service:
+                result = service.spreadsheets().values().batchGet(
+                    spreadsheetId=spreadsheet_id,
+                    ranges=intervalos
+                ).execute()
+            return [intervalo.get("values", []) for intervalo in result.get("valueRanges", [])]
+        return agendador.executar(('valores', spreadsheet_id, tuple(intervalos)), buscar)
+
+    def listar_abas(spreadsheet_id):
+        def listar():
+            with gerenciador_credenciais.cliente() as service:
+                result = service.spreadsheets().get(
+                    spreadsheetId=spreadsheet_id,
+                    fields="sheets.properties.title"
+                ).execute()
+            return [aba["properties"]["title"] for aba in result.get("sheets", [])]
+        return agendador.executar(('abas', spreadsheet_id), listar)
 
+    try:
+        # Dados compartilhados por todas as sessões: a aba do mês corrente e a aba DIÁRIO são buscadas
+        # num único batchGet, e os produtos de dados são calculados uma vez por versão (servico_dados.py)
+        with instrumentacao.medir('dados'):
+            instantaneo = servico_dados.obter(SAMPLE_SPREADSHEET_ID, buscar_intervalos, listar_abas)
+        if instantaneo is None:
+            st.error("Nenhuma aba de mês encontrada na planilha.")
+            return
+        df = instantaneo.visao('mes')
+        df_diario = instantaneo.visao('diario')
+        versao_mes = instantaneo.versao
+        dados = instantaneo.produtos
+
+        if not df.empty:
             def painel_custo():
+              custo, receita, projecao_receita_liquida = dados['comissoes']
               st.write('')
               st.write('')
               st.write('')
-              data = {
-                  "PROJEÇÕES": [
-                      "Emitido", "Saque autorizado", "Saque complementar", "Consignado", "Ativado", 
-                      "Subtotal¹", "Aguardando averbação - Emissão", "Aguardando averbação - Saque autorizado",
-                      "Bloqueado: Aguardando averbação - Emissão", "Bloqueado: Aguardando averbação - Saque autorizado", 
-                      "Aguardando averbação - Saque complementar", "Aguardando averbação - Consignado",
-                      "Expectativa de ativação", "Subtotal²", "TOTAL"
-                  ],
-                  "Qtde/Valor": [
-                      total_emitido, total_saque_autorizado, total_saque_complementar, total_novo, 0, '',
-                      aguardando_emissao, aguardando_saque_autorizado, aguardando_desbloquear_emissao,
-                      aguardando_desbloquear_saque_autorizado, aguardando_saque_complementar, aguardando_novo,
-                      expectativa_ativacao, '', ''
-                  ],
-                  "Cms": [
-                      cms_total_emitido, cms_total_saque_autorizado, cms_total_saque_complementar, cms_total_novo, 0,
-                      cms_subtotal1,
-                      cms_aguardando_emissao, cms_aguardando_saque_autorizado, cms_aguardando_desbloquear_emissao,
-                      cms_aguardando_desbloquear_saque_autorizado, cms_aguardando_saque_complementar, cms_aguardando_novo,
-                      cms_expectativa_ativacao, cms_subtotal2, total
-                  ],
-                  "% referência": [
-                      "R$ 300", "10%", "10%", "7%", "20%", "", # <-- subtotal¹
-                      "R$ 300", "10%", "R$ 300", "10%", "10%", "7%", "20%", "", # <-- subtotal²
-                      ""  # <-- TOTAL
-                  ]
-              }
-
-              data2 = {
-                  'DEDUÇÃO DE CUSTOS E DESPESAS': [
-                      'PROJEÇÃO DE RECEITA BRUTA', 'IMPOSTO', 'PREMIAÇÃO FUNCIONÁRIO', 'CAMPANHAS', 'DESPESAS ADMINISTRATIVAS',
-                      'DESPESAS COM PESSOAL', 'DISPAROS SMS', 'DISPAROS WHATSAPP', 'DESBLOQUEIO BENEFÍCIO'
-                  ],
-                  'Valor': [
-                      projecao_receita_bruta, imposto, premiacao_funcionario, campanha, despesas_adm, despesas_pessoal, 0, 0, desbloqueio_beneficio
-                  ],
-                  "% referência": [
-                      "", "16%", "15%", "", "", "", "", "", ""
-                  ]
-              }
-
-              custo = pd.DataFrame(data)
-              receita = pd.DataFrame(data2)
               colunas_numericas = ["Qtde/Valor", "Cms"]
-              custo[colunas_numericas] = custo[colunas_numericas].apply(pd.to_numeric, errors='coerce')
-              custo[colunas_numericas] = custo[colunas_numericas].applymap(
-                  lambda x: f"{x:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) else ""
-              )
-
-              coluna_numerica = ["Valor"]
-              receita[coluna_numerica] = receita[coluna_numerica].apply(pd.to_numeric, errors='coerce')
-              receita[coluna_numerica] = receita[coluna_numerica].applymap(
-                  lambda x: f"{x:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) else ""
-              )
+              tabela_custo = custo.assign(**{coluna: formatacao.formatar_numero(custo[coluna]) for coluna in colunas_numericas})
+              tabela_receita = receita.assign(Valor=formatacao.formatar_numero(receita['Valor']))
 
               st.markdown("<h3 style='text-align: center;'>📊 PROJEÇÃO DE RESULTADO</h3>", unsafe_allow_html=True)
-              st.dataframe(custo, use_container_width=True, height=562, hide_index=True)
-              st.dataframe(receita, use_container_width=True, hide_index=True)
+              st.dataframe(tabela_custo, use_container_width=True, height=562, hide_index=True)
+              st.dataframe(tabela_receita, use_container_width=True, hide_index=True)
 
               st.markdown("""
                   <style>
@@ -259,6 +159,17 @@ def main():
 
               st.markdown(F'<div class="info-box">PROJEÇÃO DE RECEITA LÍQUIDA: R$ {projecao_receita_liquida}</div>', unsafe_allow_html=True)
 
+              descricao, simulacao = dados['simulacao_ativacao']
+              if simulacao is not None:
+                  st.write('')
+                  st.markdown(f"<h4 style='text-align: center;'>SIMULAÇÃO: {descricao.upper()}</h4>", unsafe_allow_html=True)
+                  tabela_simulacao = pd.DataFrame({
+                      descricao: formatacao.formatar_percentual(simulacao['fator'] * 100) + np.where(simulacao['arquivo'], ' (atual)', ''),
+                      'Receita bruta': formatacao.formatar_numero(simulacao['receita_bruta'], 'R$ '),
+                      'Receita líquida': formatacao.formatar_numero(simulacao['receita_liquida'], 'R$ '),
+                  })
+                  st.dataframe(tabela_simulacao, use_container_width=True, hide_index=True)
+
             st.set_page_config(page_title="Painel de Vendas", page_icon="🌍", layout="wide")
             st.markdown("""
                 <style>
@@ -271,45 +182,43 @@ def main():
 
             st.sidebar.image("Sorfcred.png", caption="Call Center")
 
-            def sidebar_data():
-              if not df_selection['Data'].isna().all():
-                data_min = df_selection['Data'].min().date()
-                data_max = df_selection['Data'].max().date()
+            # Filtros dos gráficos da página Indicadores. Ficam dentro do fragmento dos gráficos
+            # (o fragmento não pode escrever na barra lateral), acima deles.
+            def filtro_data(coluna_inicial, coluna_final):
+              indice = dados['indice']
+              inicio_mes = dados['inicio_mes']
+              if indice.periodo() is not None:
+                data_min, data_max = indice.periodo()
               else:
                 st.error('Nenhuma data valida encontrada no DF')
                 data_min = datetime.date.today()
                 data_max = datetime.date.today()
 
-              st.sidebar.header('Filtrar por período')
-              data_inicial = st.sidebar.date_input('Data inicial', data_min, format='DD/MM/YYYY', help='Propostas com data de 31/01/2025 vieram do estoque de Janeiro.')
-              data_final = st.sidebar.date_input('Data final', data_max, format='DD/MM/YYYY')
+              data_inicial = coluna_inicial.date_input('Data inicial', data_min, format='DD/MM/YYYY', help=f'Propostas com data de {ingestao.data_estoque(inicio_mes):%d/%m/%Y} vieram do estoque do mês anterior.')
+              data_final = coluna_final.date_input('Data final', data_max, format='DD/MM/YYYY')
 
               st.session_state.data = (data_inicial, data_final)
-              df_filtrado = df_selection[(df_selection['Data'].dt.date >= data_inicial) & (df_selection['Data'].dt.date <= data_final)]
-              st.sidebar.write("")
 
-            def sidebar_filtros():
+            def filtro_status(coluna):
+                df = dados['vendas']
 
-                st.sidebar.header('Filtrar por status')
-                status = st.sidebar.multiselect(
-                    'Selecione o status',
+                status = coluna.multiselect(
+                    'Filtrar por status',
                     options=df['Status'].unique(),
                     default=df['Status'].unique()
                 )
 
                 st.session_state.status = status
-                st.sidebar.write("")
 
-            def sidebar_origem():
-                st.sidebar.header('Filtrar por origem')
-                origem = st.sidebar.multiselect(
-                    'Selecione a origem',
+            def filtro_origem(coluna):
+                df = dados['vendas']
+                origem = coluna.multiselect(
+                    'Filtrar por origem',
                     options=df['Origem'].unique(),
                     default=df['Origem'].unique()
                 )
 
                 st.session_state.origem = origem
-                st.sidebar.write("")
 
             def sidebar_parceiros():
                 st.sidebar.write("")
@@ -322,19 +231,20 @@ def main():
                 col3.image("facta.png", width=60)
 
             def Home1():
-                total_pago = df_selection[df_selection['Status'] == 'PAGO'].shape[0]
-                total_aguardando = df_selection[df_selection['Status'] == 'AG. INSS'].shape[0]
+                cubo = dados['cubo']
+                df_selection = dados['validas']
+                dias_passados, dias_uteis, dias_restante = dados['dias']
+                total_pago = agregacoes.somar_cubo(cubo, 'Quantidade', 'PAGO')
+                total_aguardando = agregacoes.somar_cubo(cubo, 'Quantidade', 'AG. INSS')
                 total_projetado = int(round(((total_pago + total_aguardando) / dias_passados) * dias_uteis))
-                total_meta = sum([60,	45,	45,	60,	45,	20,	20,	30,	20,	20,	30,	30,	7, 0])
+                total_meta = equipe.metas_do_mes(dados['inicio_mes'])['Meta Cartões'].sum()
                 total_atingimento = (total_projetado / total_meta) * 100
                 total_atingimento = str(int(round(total_atingimento))) + '%'
-                total_valor = df_selection[df_selection['Status'] == 'PAGO']['Valor'].sum()
-                total_bloqueado = df_selection[df_selection['Status'] == 'BLOQUEADO'].shape[0]
+                total_valor = agregacoes.somar_cubo(cubo, 'Valor', 'PAGO')
+                total_bloqueado = agregacoes.somar_cubo(cubo, 'Quantidade', 'BLOQUEADO')
                 total_pendente = df_selection[
                     (df_selection['Status'] == 'PENDENTE') & (df_selection['Perfil'] == 'ATUAL')
-                ].shape[0] + df_selection[
-                    (df_selection['Status'] == 'CANCELADO')
-                ].shape[0]
+                ].shape[0] + agregacoes.somar_cubo(cubo, 'Quantidade', 'CANCELADO')
                 total_conversao = ((total_pago + total_aguardando + total_bloqueado) / (total_pago + total_aguardando + total_bloqueado + total_pendente)) * 100
                 total_conversao = str(int(round(total_conversao))) + '%'
 
@@ -348,7 +258,7 @@ def main():
                     st.markdown('<p style="font-size:18px; color:gray;">⏳ Ag. Inss</p>', unsafe_allow_html=True)
 
                 with col3:
-                    st.info(f'{total_projetado:,.0f}')
+                    st.info(formatacao.formatar_valor(total_projetado))
                     st.markdown('<p style="font-size:18px; color:gray;">📊 Projeção</p>', unsafe_allow_html=True)
 
                 with col4:
@@ -357,7 +267,7 @@ def main():
 
                 col5, col6, col7, col8 = st.columns(4, gap='medium')
                 with col5:
-                    st.info(f'R$ {total_valor:,.0f}')
+                    st.info(formatacao.formatar_valor(total_valor, 'R$ '))
                     st.markdown('<p style="font-size:18px; color:gray;">💰 Valor Pago</p>', unsafe_allow_html=True)
 
                 with col6:
@@ -374,58 +284,31 @@ def main():
 
                     st.markdown("""---""")
 
-            Home1()
+            resumo = paginas.reservar(dados, Home1, 'cubo', 'validas', 'dias', 'inicio_mes')
 
             def painel_mensal():
-                dados_vendedores = {
-                    'Vendedor': [
-                    'ROSIMERY', 'ELLEN', 'ISABEL', 'ANTONIO', 'DANILO', 'DANIEL', 'VICTOR SILVA',
-                    'VICTOR', 'CALL CENTER - SAIU', 'LARISSA', 'JOAO', 'ANNA', 'CALL CENTER - TESTE'
-                    ],
-                    'Meta Cartões': [
-                      60, 45, 60, 45, 45, 20, 20, 20, 20, 30, 30, 20, 0
-                    ],
-                    'Meta Saque': [
-                      20000, 15000, 20000, 15000, 15000, 0, 0, 0, 0, 0, 0, 0, 0
-                    ],
-                    'Início': [
-                    '14/08/2024', '08/01/2025', '26/08/2024', '09/01/2025', '09/01/2025', '04/12/2024',
-                    '06/11/2024', '09/10/2024', '-', '04/02/2024', '04/02/2024', '04/12/2024', '-'
-                    ]
-                }
-                df_vendedores = pd.DataFrame(dados_vendedores)
-                
-                painel = df.groupby('Vendedor').agg(
-                    Pago=('Status', lambda x: (x == 'PAGO').sum()),
-                    Ag_Inss=('Status', lambda x: (x == 'AG. INSS').sum()),
-                    Valor_Pago=('Valor', lambda x: pd.to_numeric(df.loc[x.index, 'Valor'], errors='coerce').fillna(0).sum()),
-                    Bloqueado=('Status', lambda x: (x == 'BLOQUEADO').sum()),
-                    Pendente=('Status', lambda x: ((df.loc[x.index, 'Perfil'] == 'ATUAL') & (x.isin(['PENDENTE']))).sum() + (x == 'CANCELADO').sum())
-                ).reset_index()
-
-                painel = painel.merge(df_vendedores, on='Vendedor', how='left')
+                dias_passados, dias_uteis, dias_restante = dados['dias']
+                projecao_vendedores = dados['projecao']
+                painel = equipe.metricas_com_metas(dados['metricas'], versao_mes, dados['inicio_mes']).reset_index()
 
                 painel['Digitado'] = painel['Pago'] + painel['Ag_Inss'] + painel['Bloqueado'] + painel['Pendente']
                 painel['Conversão'] = ((painel['Pago'] + painel['Ag_Inss'] + painel['Bloqueado']) / painel['Digitado']) * 100
-                painel['Conversão'] = painel['Conversão'].fillna(0).replace([float('inf'), -float('inf')], 0).round().astype(int).astype(str) + '%'
-                painel['Projetado'] = (((painel['Pago'] + painel['Ag_Inss']) / dias_passados) * dias_uteis).round().astype(int)
+                painel['Conversão'] = painel['Conversão'].fillna(0).replace([float('inf'), -float('inf')], 0).round().astype(int)
+                painel['Projetado'] = painel['Vendedor'].map(projecao_vendedores).fillna(0).round().astype(int)
                 painel['Proj. Ating.'] = (painel['Projetado'] / painel['Meta Cartões']) * 100
-                painel['Proj. Ating.'] = painel['Proj. Ating.'].fillna(0).replace([float('inf'), -float('inf')], 0).round().astype(int).astype(str) + '%'
+                painel['Proj. Ating.'] = painel['Proj. Ating.'].fillna(0).replace([float('inf'), -float('inf')], 0).round().astype(int)
                 painel['Meta Saque'] = painel['Meta Saque'].fillna(0).round().astype(int)
-                painel['Meta Saque'] = painel['Meta Saque'].apply(lambda x: f'R$ {x:,}'.replace(',', '.'))
 
                 painel['Soma'] = painel['Pago'] + painel['Ag_Inss']
                 painel = painel.sort_values(by='Soma', ascending=False)
                 painel = painel.drop(columns=['Soma'])
 
-                total = painel[['Meta Cartões', 'Meta Saque', 'Projetado', 'Digitado', 'Pago', 'Ag_Inss', 'Valor_Pago', 'Bloqueado', 'Pendente']].sum()
+                colunas_total = ['Meta Cartões', 'Meta Saque', 'Projetado', 'Digitado', 'Pago', 'Ag_Inss', 'Valor_Pago', 'Bloqueado', 'Pendente']
+                total = pd.Series({coluna: painel[coluna].sum() for coluna in colunas_total}, dtype=object)
                 total['Vendedor'] = 'Total'
-                total['Conversão'] = (total['Pago'] + total['Ag_Inss'] + total['Bloqueado']) / total['Digitado'] * 100
-                total['Conversão'] = str(int(round(total['Conversão']))) + '%'
-                total['Proj. Ating.'] = (total['Projetado'] / total['Meta Cartões']) * 100
-                total['Proj. Ating.'] = str(int(round(total['Proj. Ating.']))) + '%'
+                total['Conversão'] = int(round((total['Pago'] + total['Ag_Inss'] + total['Bloqueado']) / total['Digitado'] * 100))
+                total['Proj. Ating.'] = int(round((total['Projetado'] / total['Meta Cartões']) * 100))
                 total['Projetado'] = int(round(painel['Projetado'].sum()))
-                total['Meta Saque'] = f'R$ {painel['Meta Saque'].str.replace("R$ ", "").str.replace(".", "").round().astype(int).sum():,}'.replace(',', '.')
 
                 painel = pd.concat([painel, total.to_frame().T], ignore_index=True)
                 painel = painel.reindex(columns=['Vendedor', 'Meta Cartões', 'Meta Saque', 'Projetado',	'Proj. Ating.', 'Digitado', 'Pago', 'Ag_Inss', 'Valor_Pago', 'Bloqueado', 'Conversão', 'Pendente'])
@@ -434,7 +317,13 @@ def main():
           #      st.subheader("📌 PAINEL MENSAL")
                 st.markdown("<h3 style='text-align: center;'>📌 PAINEL MENSAL</h3>", unsafe_allow_html=True)
           #      st.markdown("##")
-                st.dataframe(painel, use_container_width=True, height=528, hide_index=True)
+                tabela = painel.assign(**{
+                    'Meta Saque': formatacao.formatar_numero(painel['Meta Saque'], 'R$ '),
+                    'Valor_Pago': formatacao.formatar_numero(painel['Valor_Pago'], 'R$ '),
+                    'Proj. Ating.': formatacao.formatar_percentual(painel['Proj. Ating.']),
+                    'Conversão': formatacao.formatar_percentual(painel['Conversão']),
+                })
+                st.dataframe(tabela, use_container_width=True, height=528, hide_index=True)
 
                 st.markdown("""
                       <p style="text-align: center; font-size: 16px; font-weight: bold;">
@@ -443,7 +332,8 @@ def main():
                   """, unsafe_allow_html=True)
                 st.write("")
 
-                painel_sem_total = painel[~painel['Vendedor'].isin(['Total', 'CALL CENTER - SAIU', 'CALL CENTER - TESTE'])]
+                inativos = painel['Vendedor'].map(equipe.metas_do_mes(dados['inicio_mes'])['Ativo']).eq(False)
+                painel_sem_total = painel[(painel['Vendedor'] != 'Total') & ~inativos]
                 painel_sem_total['Total_Aceites'] = painel_sem_total[['Pago', 'Ag_Inss', 'Bloqueado']].sum(axis=1)
                 mais_aceites_vendedor = painel_sem_total.loc[painel_sem_total['Total_Aceites'].idxmax(), 'Vendedor']
                 mais_aceites_qtde = painel_sem_total['Total_Aceites'].max()
@@ -452,15 +342,15 @@ def main():
                 vendedores_com_aceites_validos = vendedores_ordenados[vendedores_ordenados['Total_Aceites'] >= (dias_passados * 2)]
 
                 if not vendedores_com_aceites_validos.empty:
-                    melhor_conversao_idx = vendedores_com_aceites_validos['Conversão'].str.replace('%', '').round().astype(int).idxmax()
+                    melhor_conversao_idx = vendedores_com_aceites_validos['Conversão'].astype(int).idxmax()
                 else:
-                    melhor_conversao_idx = painel_sem_total['Conversão'].str.replace('%', '').round().astype(int).idxmax()
+                    melhor_conversao_idx = painel_sem_total['Conversão'].astype(int).idxmax()
 
                 melhor_conversao_vendedor = painel_sem_total.loc[melhor_conversao_idx, 'Vendedor']
-                melhor_conversao_valor = painel_sem_total.loc[melhor_conversao_idx, 'Conversão']
+                melhor_conversao_valor = f"{painel_sem_total.loc[melhor_conversao_idx, 'Conversão']}%"
 
-                melhor_projecao_valor = painel_sem_total['Proj. Ating.'].str.replace('%', '').round().astype(int).max()
-                melhor_projecao_vendedores = painel_sem_total[painel_sem_total['Proj. Ating.'].str.replace('%', '').round().astype(int) == melhor_projecao_valor]['Vendedor'].tolist()
+                melhor_projecao_valor = painel_sem_total['Proj. Ating.'].astype(int).max()
+                melhor_projecao_vendedores = painel_sem_total[painel_sem_total['Proj. Ating.'].astype(int) == melhor_projecao_valor]['Vendedor'].tolist()
 
                 st.write("")
                 quantidade_vendedores = painel_sem_total['Vendedor'].nunique()
@@ -518,144 +408,71 @@ def main():
 
             st.write("")
       #      def graficos(df_filtrado):
+            # Fragmento: mudar um filtro refaz só os gráficos, sem reexecutar a página
+            # (busca, Home1, plano de recuperação e projeção de resultado ficam como estão)
+            @st.fragment
             def graficos():
+                with instrumentacao.medir('fragmento:graficos'):
+                    desenhar_graficos()
+
+            def desenhar_graficos():
                 st.write("")
                 st.write("")
                 st.write("")
+                col_data_inicial, col_data_final, col_status, col_origem = st.columns(4)
+                filtro_data(col_data_inicial, col_data_final)
+                filtro_status(col_status)
+                filtro_origem(col_origem)
                 if 'resultado' not in st.session_state or st.session_state.resultado is None:
                   st.session_state.resultado = ['ACEITE', 'PEND. ACEITE']
                 status = st.session_state.status
                 origem = st.session_state.origem
                 resultado = st.session_state.resultado
-                data = st.session_state.data
                 data_inicial, data_final = st.session_state.data
-                df_filtrado = df_selection[(df_selection['Status'].isin(status)) &
-                                          (df_selection['Origem'].isin(origem)) &
-                                          (df_selection['Resultado_Status'].isin(resultado)) &
-                                          (df_selection['Data'].dt.date) &
-                                          (df_selection['Data'].dt.date >= data_inicial) &
-                                          (df_selection['Data'].dt.date <= data_final)]
-                if df_filtrado.empty:
+                indice_periodo, versao_periodo = indice_com_historico(data_inicial, data_final)
+                with instrumentacao.medir('figuras'):
+                    figs = figuras.figuras_indicadores(indice_periodo, versao_periodo, status, origem, resultado, (data_inicial, data_final))
+                if figs is None:
                     st.warning("Nenhum dado disponível. Por favor, selecione algum status.")
                     return
-                origem = df_filtrado['Origem'].value_counts().sort_values(ascending=True)
-                produto = df_filtrado['Produto'].value_counts().sort_values(ascending=True)
-                especie = df_filtrado['Espécie'].value_counts().sort_values(ascending=True)
-                banco = df_filtrado['Banco'].value_counts().sort_values(ascending=True)
-                resultado = df_filtrado['Resultado_Status'].value_counts()
-                data_resultado_count = df_filtrado.groupby(['Data', 'Resultado_Status']).size().reset_index(name='Quantidade')
-
-                fig_produto = px.bar(
-                    x=produto.values,
-                    y=produto.index,
-                    orientation='h',
-                    title='<b>Distribuição por:  Produto</b>',
-                    color_discrete_sequence=['#FFC000'] * len(produto),
-                    template='plotly_white'
-                )
-
-                fig_produto.update_layout(
-                    plot_bgcolor='rgba(0, 0, 0, 0)',
-                    xaxis=dict(showgrid=False, title='', showticklabels=False),
-                    yaxis=dict(title='')
-                )
-
-                fig_origem = px.bar(
-                    x=origem.values,
-                    y=origem.index,
-                    orientation='h',
-                    title='<b>                    Origem</b>',
-                    color_discrete_sequence=['#FFC000'] * len(origem),
-                    template='plotly_white'
-                )
-
-                fig_origem.update_layout(
-                    plot_bgcolor='rgba(0, 0, 0, 0)',
-                    xaxis=dict(showgrid=False, title='', showticklabels=False),
-                    yaxis=dict(title=''),
-                    xaxis_title='Quantidade Vendas'
-                )
-
-                fig_especie = px.bar(
-                    x=especie.values,
-                    y=especie.index,
-                    orientation='h',
-                    title='<b>                    Espécie</b>',
-                    color_discrete_sequence=['#FFC000'] * len(especie),
-                    template='plotly_white'
-                )
-
-                fig_especie.update_layout(
-                    plot_bgcolor='rgba(0, 0, 0, 0)',
-                    xaxis=dict(showgrid=False, title='', showticklabels=False),
-                    yaxis=dict(title='')
-                )
-
-                fig_banco = px.bar(
-                    x=banco.values,
-                    y=banco.index,
-                    orientation='h',
-                    title='<b>                    Banco</b>',
-                    color=banco.index,
-                    color_discrete_map={
-                      'BMG': '#FFC000',
-                      'Pine': '#D9E1F2',
-                      'FACTA': '#305496',
-                    },
-                    template='plotly_white'
-                )
-
-                fig_banco.update_layout(
-                    plot_bgcolor='rgba(0, 0, 0, 0)',
-                    xaxis=dict(showgrid=False, title='', showticklabels=False),
-                    yaxis=dict(title='')
-                )
 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                  st.plotly_chart(fig_produto, use_container_width=True)
+                  mostrar_grafico(figs['Produto'])
                 with col2:
-                  st.plotly_chart(fig_origem, use_container_width=True)
+                  mostrar_grafico(figs['Origem'])
                 with col3:
-                  st.plotly_chart(fig_especie, use_container_width=True)
+                  mostrar_grafico(figs['Espécie'])
                 with col4:
-                  st.plotly_chart(fig_banco, use_container_width=True)
-
-                fig_resultado = px.bar(
-                    data_resultado_count,
-                    x='Data',
-                    y='Quantidade',
-                    color='Resultado_Status',
-                    title='<b>Acompanhamento de aceite diário</b>',
-                    template='plotly_white',
-                    #color_discrete_sequence=px.colors.qualitative.Set1
-                    color_discrete_map={
-                      'ACEITE': '#A9D08E',
-                      'PEND. ACEITE': '#FF7D7D',
-                    },
-                )
-
-                fig_resultado.update_layout(
-                    xaxis=dict(
-                        showgrid=False,
-                        title='Quantidade de Vendas',
-                        tickmode='array',
-                        tickvals=data_resultado_count['Data'].unique(),
-                        tickformat='%b %d'
-                    ),
-                    yaxis=dict(
-                        title='',
-                        showgrid=False,
-                        zeroline=False,
-                        gridcolor='rgba(0,0,0,0)'
-                    ),
-                    plot_bgcolor='rgba(0, 0, 0, 0)'
-                )
-                st.plotly_chart(fig_resultado, use_container_width=True)
-              
-                df_filtrado = df[df['Status'].isin(status)]
-                df_filtrado = df_filtrado[df_filtrado['Origem'].isin(['DISCADOR', 'URA', 'INDICAÇÃO', 'SMS', 'REVERSAO', 'REDE'])]
-                df_filtrado = df_filtrado[df_filtrado['Produto'].isin(['Cartão sem Saque', 'Cartão com Saque', 'Margem Livre', 'Saque Complementar'])]
+                  mostrar_grafico(figs['Banco'])
+
+                mostrar_grafico(figs['Data'])
+
+            # Período que começa antes do mês corrente: junta os meses fechados do histórico
+            def indice_com_historico(data_inicial, data_final):
+                indice = dados['indice']
+                df_selection = dados['validas']
+                inicio_mes = dados['inicio_mes']
+                particoes = historico.particoes_do_periodo(data_inicial, data_final, inicio_mes)
+                if not particoes:
+                    return indice, versao_mes
+                vendas = historico.vendas_com_historico(df_selection, versao_mes, inicio_mes, particoes)
+                versao_periodo = (versao_mes,) + particoes
+                return filtros.indice_filtros(vendas, versao_periodo), versao_periodo
+
+            def comparativo_mensal():
+                df_selection = dados['validas']
+                inicio_mes = dados['inicio_mes']
+                particoes = historico.particoes_do_periodo(datetime.date.min, inicio_mes.date(), inicio_mes)
+                resumo = historico.resumo_mensal(df_selection, versao_mes, inicio_mes, particoes)
+                tabela_resumo = resumo.assign(**{
+                    'Propostas': formatacao.formatar_numero(resumo['Propostas']),
+                    'Pagas': formatacao.formatar_numero(resumo['Pagas']),
+                    'Valor Pago': formatacao.formatar_numero(resumo['Valor Pago'], 'R$ '),
+                })
+                st.write('')
+                st.markdown("<h3 style='text-align: center;'>📅 COMPARATIVO MENSAL</h3>", unsafe_allow_html=True)
+                st.dataframe(tabela_resumo, use_container_width=True, hide_index=True)
 
             def aceite_diario():
                 st.write("")
@@ -664,93 +481,34 @@ def main():
                 if 'resultado' not in st.session_state or st.session_state.resultado is None:
                   st.session_state.resultado = ['ACEITE', 'PEND. ACEITE']
                 resultado = st.session_state.resultado
-                df_filtrado = df_selection[(df_selection['Resultado_Status'].isin(resultado)) &
-                                          (df_selection['Data'].dt.date)]
-
-      #          data = st.session_state.data
-      #          resultado = df_filtrado['Resultado_Status'].value_counts()
-                data_resultado_count = df_filtrado.groupby(['Data', 'Resultado_Status']).size().reset_index(name='Quantidade')
-
-                fig_resultado = px.bar(
-                    data_resultado_count,
-                    x='Data',
-                    y='Quantidade',
-                    color='Resultado_Status',
-                    title='<b>Acompanhamento de aceite diário</b>',
-                    template='plotly_white',
-                    #color_discrete_sequence=px.colors.qualitative.Set1
-                    color_discrete_map={
-                      'ACEITE': '#A9D08E',
-                      'PEND. ACEITE': '#FF7D7D',
-                    },
-                )
-
-                fig_resultado.update_layout(
-                    xaxis=dict(
-                        showgrid=False,
-                        title='Quantidade de Vendas',
-                        tickmode='array',
-                        tickvals=data_resultado_count['Data'].unique(),
-                        tickformat='%b %d'
-                    ),
-                    yaxis=dict(
-                        title='',
-                        showgrid=False,
-                        zeroline=False,
-                        gridcolor='rgba(0,0,0,0)'
-                    ),
-                    plot_bgcolor='rgba(0, 0, 0, 0)'
-                )
-                st.plotly_chart(fig_resultado, use_container_width=True)
+                with instrumentacao.medir('figuras'):
+                    fig_resultado = figuras.figura_aceite_diario(dados['indice'], versao_mes, resultado)
+                mostrar_grafico(fig_resultado)
 
             def painel_recuperacao():
-                dados_vendedores2 = {
-                    'Vendedor': [
-                    'ROSIMERY', 'ELLEN', 'ISABEL', 'ANTONIO', 'DANILO', 'DANIEL', 'VICTOR SILVA',
-                    'VICTOR', 'LARISSA', 'JOAO', 'ANNA'
-                    ],
-                    'Meta Cartões': [
-                      60, 45, 60, 45, 45, 20, 20, 20, 30, 30, 20
-                    ],
-                    'Meta Saque': [
-                      20000, 15000, 20000, 15000, 15000, 0, 0, 0, 0, 0, 0
-                    ],
-                    'Início': [
-                    '14/08/2024', '08/01/2025', '26/08/2024', '09/01/2025', '09/01/2025', '04/12/2024',
-                    '06/11/2024', '09/10/2024', '04/02/2024', '04/02/2024', '04/12/2024'
-                    ]
-                }
-                df_vendedores2 = pd.DataFrame(dados_vendedores2)
-
                 dados_painel_recuperacao = {
                   'Conversão s/ Digitação': ['> 70%', 'De 40% à 69%', '< 39%'],
                   'Plano Recuperação': ['Satisfatório', 'Em Desenvolvimento', 'À Desenvolver']
                 }
                 df_recuperacao = pd.DataFrame(dados_painel_recuperacao)
 
-                painel2 = df.groupby('Vendedor').agg(
-                    Pago=('Status', lambda x: (x == 'PAGO').sum()),
-                    Ag_Inss=('Status', lambda x: (x == 'AG. INSS').sum()),
-                    Valor_Pago=('Valor', lambda x: pd.to_numeric(df.loc[x.index, 'Valor'], errors='coerce').fillna(0).sum()),
-                    Bloqueado=('Status', lambda x: (x == 'BLOQUEADO').sum()),
-                    Pendente=('Status', lambda x: ((df.loc[x.index, 'Perfil'] == 'ATUAL') & (x.isin(['PENDENTE']))).sum() + (x == 'CANCELADO').sum())
-                ).reset_index()
-
-                painel2 = painel2.merge(df_vendedores2, on='Vendedor', how='inner')
+                dias_passados, dias_uteis, dias_restante = dados['dias']
+                projecao_vendedores = dados['projecao']
+                painel2 = equipe.metricas_com_metas(dados['metricas'], versao_mes, dados['inicio_mes'])
+                painel2 = painel2[painel2['Ativo'].eq(True)].reset_index()
                 vendedor_pendente = painel2.loc[painel2['Pendente'].idxmax(), 'Vendedor']
                 cartoes_pendentes = painel2['Pendente'].max()
                 total_pendente = painel2['Pendente'].sum()
                 media_pend_dia = round(total_pendente / dias_passados)
                 media_cartoes_pend_dia = round(cartoes_pendentes / dias_passados)
 
-                projecao_meta = (((painel2['Pago'] + painel2['Ag_Inss']) / dias_passados) * dias_uteis).round()
+                projecao_meta = painel2['Vendedor'].map(projecao_vendedores).fillna(0).round()
                 vendedores_fora_meta = painel2.loc[projecao_meta < painel2['Meta Cartões'], 'Vendedor'].tolist()
 
                 painel2['Total Digitado'] = painel2['Pago'] + painel2['Ag_Inss'] + painel2['Bloqueado'] + painel2['Pendente']
                 painel2['Total Aceite'] = painel2['Pago'] + painel2['Ag_Inss'] + painel2['Bloqueado']
                 painel2['Conv. s/ Digitação'] = ((painel2['Pago'] + painel2['Ag_Inss'] + painel2['Bloqueado']) / painel2['Total Digitado']) * 100
                 painel2['Conv. s/ Digitação'] = painel2['Conv. s/ Digitação'].fillna(0).replace([float('inf'), -float('inf')], 0)
-                menor_conversao = painel2['Conv. s/ Digitação'].min()
                 
                 def definir_plano(conversao):
                   if conversao <= 39.99:
@@ -820,8 +578,10 @@ def main():
                   st.write('')
                 if len(vendedores_fora_meta) > 1:
                   st.markdown(f"<p style='text-align: center;'>Vendedores que não estão projetando meta: <strong>{', '.join(vendedores_fora_meta)}</strong></p>", unsafe_allow_html=True)
-                else:
+                elif vendedores_fora_meta:
                   st.markdown(f"<p style='text-align: center;'>Vendedor que não está projetando meta: <strong>{vendedores_fora_meta[0]}</strong></p>", unsafe_allow_html=True)
+                else:
+                  st.write('')
 
                 st.text('')
                 st.text('')
@@ -848,87 +608,154 @@ def main():
                     st.markdown("<p style='text-align: left; font-size: 20px;'><strong>🚨 À Desenvolver</strong></p>", unsafe_allow_html=True)
                     st.dataframe(painel_a_desenvolver, hide_index=True)
 
-                print()
-
         else:
-          print("Nenhum dado encontrado na planilha.")
-
-        if valores_diario:
-          st.cache_data.clear()
-          df_diario = pd.DataFrame(valores_diario [1:], columns=valores_diario[0])
-          colunas_final = ['Vendedor', ' Meta Dia ', 'Valor', ' Aceite Dia ', ' Aceite Anterior ', ' Total ', 'Ligações', 'TMA']
-          df_diario = df_diario[colunas_final]
+          st.error("Nenhum dado encontrado na planilha.")
+
+        # Painel do dia calculado das propostas do mês (aceites por vendedor e por dia, uma vez por versão
+        # dos dados), para qualquer dia do mês e qualquer tamanho de equipe. Da aba DIÁRIO só vêm
+        # Ligações e TMA, quando existirem, e só no dia mais recente.
+        # Fragmento: trocar o dia refaz só este painel.
+        @st.fragment
+        def painel_diario():
+            inicio_mes = dados['inicio_mes']
+            referencia = dados['referencia']
+            st.write('')
+            st.markdown("<h3 style='text-align: center;'>💳 PAINEL DIÁRIO</h3>", unsafe_allow_html=True)
+            dia = st.date_input('Dia', referencia, min_value=inicio_mes.date(), max_value=max(referencia, inicio_mes.date()), format='DD/MM/YYYY')
+
+            painel = agregacoes.resumo_do_dia(dados['aceites_diarios'], dia, equipe.metas_do_mes(inicio_mes))
+            painel = painel.sort_values(by=['Aceite Dia', 'Total'], ascending=False)
+            colunas_total = ['Meta Dia', 'Aceite Dia', 'Aceite Anterior', 'Total', 'Falta', 'Valor']
+            total = pd.Series({coluna: painel[coluna].sum() for coluna in colunas_total}, dtype=object)
+            total['Vendedor'] = 'Total'
+            painel = pd.concat([painel, total.to_frame().T], ignore_index=True)
+
+            diario = df_diario.rename(columns=str.strip)
+            colunas_ligacoes = [coluna for coluna in ['Ligações', 'TMA'] if coluna in diario.columns]
+            if dia == referencia and 'Vendedor' in diario.columns and colunas_ligacoes:
+                ligacoes = diario.set_index(diario['Vendedor'].str.strip())[colunas_ligacoes]
+                painel = painel.join(ligacoes[~ligacoes.index.duplicated()], on='Vendedor')
+
+            tabela = painel.assign(Valor=formatacao.formatar_numero(painel['Valor'], 'R$ '))
+            st.dataframe(tabela, use_container_width=True, height=35 * (len(tabela) + 1) + 3, hide_index=True)
+            meta_do_dia = int(total['Meta Dia'])
+            vendido_no_dia = int(total['Aceite Dia'])
+            diferenca = vendido_no_dia - meta_do_dia
+            resultado = diferenca - (diferenca * 2)
+            df_sem_total = painel.iloc[:-1]
+            maior_aceite_dia = int(df_sem_total['Aceite Dia'].max()) if not df_sem_total.empty else 0
+            destaque_dia = df_sem_total.loc[df_sem_total['Aceite Dia'] == maior_aceite_dia, 'Vendedor'].tolist()
+            
+            st.markdown("""
+                  <p style="text-align: center; font-size: 16px; font-weight: bold;">
+                      As atualizações do painel acontecem às 11h, 14h, 16h e 18h
+                  </p>
+              """, unsafe_allow_html=True)
+            st.write("")
+            st.markdown("""
+                  <style>
+                  .info-box {
+                      background-color: #e0f3ff;
+                      padding: 15px;
+                      border-radius: 5px;
+                      border-left: 6px solid #1f77b4;
+                      text-align: center;
+                      font-weight: bold;
+                  }
+                  </style>
+              """, unsafe_allow_html=True)
+            
+            col1, col2 = st.columns(2, gap='medium')
+            with col1:
+                  st.markdown(f'<div class="info-box">Meta do dia: {meta_do_dia} cartões</div>', unsafe_allow_html=True)
+              
+            with col2:
+                  if diferenca > 0:
+                    st.markdown(f'<div class="info-box">Parabéns!👏👏👏 Meta do dia superada em {diferenca} cartões.</div>', unsafe_allow_html=True)
+                  elif diferenca == 0:
+                    st.markdown('<div class="info-box">Objetivo cumprido! Meta do dia atingida com sucesso 🚀</div>', unsafe_allow_html=True)
+                  elif diferenca < 0:
+                    st.markdown(f'<div class="info-box">🚨 Faltam {resultado} cartões para batermos a meta do dia</div>', unsafe_allow_html=True)
+                  else:
+                    st.markdown('<div class="info-box">Verifique!</div>', unsafe_allow_html=True)
 
-          def painel_diario():
+            st.write("")
+            st.write("")
+            st.write("")
+            st.write("")
+            if maior_aceite_dia > 0:
+              if len(destaque_dia) == 1:
+                  destaque_str = destaque_dia[0]
+                  st.markdown("<p style='text-align: center; font-size: 20px;'><strong>🥇 Destaque do dia</strong></p>", unsafe_allow_html=True)
+                  st.markdown(f"<p style='text-align: center;<st>'>Maior quantidade de aceites do dia: <strong>{destaque_str}</strong> com <strong>{maior_aceite_dia} </strong> aceites</p>", unsafe_allow_html=True)
+              elif len(destaque_dia) > 1:
+                  destaque_str = ", ".join(destaque_dia)
+                  st.markdown("<p style='text-align: center; font-size: 20px;'><strong>🥇 Destaque do dia</strong></p>", unsafe_allow_html=True)
+                  st.markdown(f"<p style='text-align: center;<st>'>Maior quantidade de aceites do dia: <strong>{destaque_str}</strong> com <strong>{maior_aceite_dia} </strong> aceites</p>", unsafe_allow_html=True)
+            else:
               st.write('')
-              st.markdown("<h3 style='text-align: center;'>💳 PAINEL DIÁRIO</h3>", unsafe_allow_html=True)
-              st.dataframe(df_diario, use_container_width=True, height=493, hide_index=True)
-              meta_do_dia = int(df_diario.loc[len(df_diario) - 1, ' Meta Dia '])
-              vendido_no_dia = int(df_diario.loc[len(df_diario) - 1, ' Total '])
-              diferenca = vendido_no_dia - meta_do_dia
-              resultado = diferenca - (diferenca * 2)
-              df_sem_total = df_diario.iloc[:-1].copy()
-              df_sem_total[' Total '] = pd.to_numeric(df_sem_total[' Total '], errors='coerce')
-              maior_aceite_dia = int(df_sem_total[' Total '].max())
-              destaque_dia = df_sem_total.loc[df_sem_total[' Total '] == maior_aceite_dia, 'Vendedor'].tolist()
-              
-              st.markdown("""
-                    <p style="text-align: center; font-size: 16px; font-weight: bold;">
-                        As atualizações do painel acontecem às 11h, 14h, 16h e 18h
-                    </p>
-                """, unsafe_allow_html=True)
-              st.write("")
-              st.markdown("""
-                    <style>
-                    .info-box {
-                        background-color: #e0f3ff;
-                        padding: 15px;
-                        border-radius: 5px;
-                        border-left: 6px solid #1f77b4;
-                        text-align: center;
-                        font-weight: bold;
-                    }
-                    </style>
-                """, unsafe_allow_html=True)
-              
-              col1, col2 = st.columns(2, gap='medium')
-              with col1:
-                    st.markdown(f'<div class="info-box">Meta do dia: {meta_do_dia} cartões</div>', unsafe_allow_html=True)
-                
-              with col2:
-                    if diferenca > 0:
-                      st.markdown(f'<div class="info-box">Parabéns!👏👏👏 Meta do dia superada em {diferenca} cartões.</div>', unsafe_allow_html=True)
-                    elif diferenca == 0:
-                      st.markdown(f'<div class="info-box">Objetivo cumprido! Meta do dia atingida com sucesso 🚀</div>', unsafe_allow_html=True)
-                    elif diferenca < 0:
-                      st.markdown(f'<div class="info-box">🚨 Faltam {resultado} cartões para batermos a meta do dia</div>', unsafe_allow_html=True)
-                    else:
-                      st.markdown(f'<div class="info-box">Verifique!</div>', unsafe_allow_html=True)
-
-              st.write("")
-              st.write("")
-              st.write("")
-              st.write("")
-              if maior_aceite_dia > 0:
-                if len(destaque_dia) == 1:
-                    destaque_str = destaque_dia[0]
-                    st.markdown("<p style='text-align: center; font-size: 20px;'><strong>🥇 Destaque do dia</strong></p>", unsafe_allow_html=True)
-                    st.markdown(f"<p style='text-align: center;<st>'>Maior quantidade de aceites do dia: <strong>{destaque_str}</strong> com <strong>{maior_aceite_dia} </strong> aceites</p>", unsafe_allow_html=True)
-                elif len(destaque_dia) > 1:
-                    destaque_str = ", ".join(destaque_dia)
-                    st.markdown("<p style='text-align: center; font-size: 20px;'><strong>🥇 Destaque do dia</strong></p>", unsafe_allow_html=True)
-                    st.markdown(f"<p style='text-align: center;<st>'>Maior quantidade de aceites do dia: <strong>{destaque_str}</strong> com <strong>{maior_aceite_dia} </strong> aceites</p>", unsafe_allow_html=True)
-              else:
-                st.write('')
+
+        # Página oculta: tempos das etapas, chamadas à API e memória do processo
+        def diagnostico():
+            st.write('')
+            st.markdown("<h3 style='text-align: center;'>🩺 DIAGNÓSTICO DE DESEMPENHO</h3>", unsafe_allow_html=True)
+            resumo_etapas = instrumentacao.resumo()
+            if resumo_etapas.empty:
+                st.write('Nenhuma medição registrada ainda.')
+            else:
+                st.dataframe(resumo_etapas, use_container_width=True, hide_index=True)
+
+            api = agendador.metricas()
+            latencia = f"{api['latencia_p50'] * 1000:.0f} / {api['latencia_p95'] * 1000:.0f} ms" if api['latencia_p50'] is not None else '-'
+            memoria = instrumentacao.memoria_processo()
+            col1, col2, col3, col4 = st.columns(4, gap='medium')
+            with col1:
+                st.info(f"{api['chamadas']} ({api['coalescidas']} unificadas)")
+                st.markdown('<p style="font-size:18px; color:gray;">📡 Chamadas à API</p>', unsafe_allow_html=True)
+            with col2:
+                st.info(f"{api['cota_usada_no_minuto']} / {api['cota_por_minuto']}")
+                st.markdown('<p style="font-size:18px; color:gray;">⏱️ Cota no minuto</p>', unsafe_allow_html=True)
+            with col3:
+                st.info(latencia)
+                st.markdown('<p style="font-size:18px; color:gray;">🌐 Latência p50 / p95</p>', unsafe_allow_html=True)
+            with col4:
+                st.info(f'{memoria / instrumentacao.MB:.0f} MB' if memoria is not None else '-')
+                st.markdown('<p style="font-size:18px; color:gray;">🧠 Memória do processo</p>', unsafe_allow_html=True)
+            if api['falhas']:
+                st.write(f"Falhas: {api['falhas']} ({api['repeticoes']} repetições), por erro: {api['erros']}")
+
+            st.markdown("<h3 style='text-align: center;'>🧮 MEMÓRIA DOS DADOS</h3>", unsafe_allow_html=True)
+            memoria_dados = instantaneo.relatorio_memoria()
+            st.dataframe(memoria_dados.assign(**{
+                'Memória (MB)': memoria_dados['Memória (MB)'].map(lambda valor: f'{valor:.1f}'),
+                'Como texto (MB)': memoria_dados['Como texto (MB)'].map(lambda valor: f'{valor:.1f}' if pd.notna(valor) else '-'),
+                'Redução': memoria_dados['Redução'].map(lambda valor: f'{valor:.0%}' if pd.notna(valor) else '-'),
+            }), use_container_width=True, hide_index=True)
+
+            relatorios = dados_planilha.relatorios_leitura(SAMPLE_SPREADSHEET_ID)
+            if relatorios:
+                st.markdown("<h3 style='text-align: center;'>📄 LEITURA DA PLANILHA</h3>", unsafe_allow_html=True)
+                st.dataframe(pd.DataFrame([
+                    {'Intervalo': intervalo, 'Linhas': relatorio.linhas, 'Completadas': relatorio.curtas,
+                     'Fora do formato': relatorio.malformadas, 'Detalhes': relatorio.resumo()}
+                    for intervalo, relatorio in relatorios.items()
+                ]), use_container_width=True, hide_index=True)
+
+            col5, col6 = st.columns(2)
+            col5.download_button('Exportar (Prometheus)', instrumentacao.prometheus(api), file_name='painel.prom', mime='text/plain')
+            col6.download_button('Exportar (JSON lines)', instrumentacao.jsonl(), file_name='painel_medicoes.jsonl', mime='application/json')
 
         def navegacao():
             senha_supervisao = os.getenv("SENHA_SUPERVISAO")
             senha_gerente = os.getenv("SENHA_GERENTE")
+            senha_diagnostico = os.getenv("SENHA_DIAGNOSTICO")
 
             if senha_supervisao is not None:
                 senha_supervisao = int(senha_supervisao)
             if senha_gerente is not None:
                 senha_gerente = int(senha_gerente)
+            if senha_diagnostico is not None:
+                senha_diagnostico = int(senha_diagnostico)
 
             selected = option_menu(
               menu_title='Página Principal',
@@ -939,33 +766,50 @@ def main():
               orientation='horizontal'
             )
           
+            # Cada seção declara os produtos de dados que usa; só esses são calculados,
+            # em paralelo, e a seção aparece no lugar reservado quando eles ficam prontos
+            secoes = [resumo]
+
             if selected == 'Home':
               sidebar_parceiros()
-              painel_mensal()
+              secoes.append(paginas.reservar(dados, painel_mensal, 'metricas', 'projecao', 'dias', 'inicio_mes'))
 
             if selected == 'Vendas do Dia':
               sidebar_parceiros()
-              painel_diario()
+              secoes.append(paginas.reservar(dados, painel_diario, 'aceites_diarios', 'inicio_mes', 'referencia'))
 
             if selected == 'Indicadores':
               senha_digitada = st.text_input('Digite o pin: ', type='password')
               if senha_digitada.isdigit() and int(senha_digitada) == senha_gerente:
-                  sidebar_data()
-                  sidebar_filtros()
-                  sidebar_origem()
+                  secoes.append(paginas.reservar(dados, painel_recuperacao, 'metricas', 'projecao', 'dias', 'inicio_mes'))
+                  secoes.append(paginas.reservar(dados, graficos, 'indice', 'vendas', 'validas', 'inicio_mes', 'historico'))
+                  secoes.append(paginas.reservar(dados, painel_custo, 'comissoes', 'simulacao_ativacao'))
+                  secoes.append(paginas.reservar(dados, comparativo_mensal, 'validas', 'inicio_mes', 'historico'))
                   sidebar_parceiros()
-                  painel_recuperacao()
-                  graficos()
-                  painel_custo()
 
               elif senha_digitada.isdigit() and int(senha_digitada) == senha_supervisao:
                   sidebar_parceiros()
-                  painel_recuperacao()
-                  aceite_diario()
+                  secoes.append(paginas.reservar(dados, painel_recuperacao, 'metricas', 'projecao', 'dias', 'inicio_mes'))
+                  secoes.append(paginas.reservar(dados, aceite_diario, 'indice'))
+
+              elif senha_digitada.isdigit() and int(senha_digitada) == senha_diagnostico:
+                  secoes.append(paginas.reservar(dados, diagnostico))
               else:
                   st.write('Não foi possível exibir nenhuma análise')
 
+            paginas.concluir(secoes)
+
+        # Sessões abertas (a TV da sala de vendas, por exemplo) conferem a versão dos dados sem refazer
+        # a página; ela só é refeita quando o atualizador traz uma versão nova da planilha
+        chave_desenhada = instantaneo.chave
+
+        @st.fragment(run_every=INTERVALO_VERIFICACAO)
+        def verificar_atualizacao():
+            if servico_dados.chave_atual(SAMPLE_SPREADSHEET_ID, listar_abas) != chave_desenhada:
+                st.rerun()
+
         navegacao()
+        verificar_atualizacao()
         st.write("")
         st.write("")
         st.write("")
@@ -981,7 +825,11 @@ def main():
         """, unsafe_allow_html=True)
 
     except HttpError as err:
-      print(err)
+      # O status já entra nas métricas do agendador; aqui conta a página que ficou sem dados
+      instrumentacao.registrar(f'erro:planilha {err.resp.status}', 0)
+      st.error("Não foi possível acessar a planilha no momento e não há uma cópia local dos dados. Tente novamente em alguns minutos.")
 
 if __name__ == "__main__":
-  main()
+  with instrumentacao.medir('rerun'):
+    main()
+  instrumentacao.exportar(agendador.metricas())
@@ -0,0 +1,198 @@
+import re
+import time
+import calendar
+import threading
+
+import httplib2
+import numpy as np
+from googleapiclient.errors import HttpError
+
+# Planilha falsa, no lugar da API do Google Sheets, para benchmarks e testes de carga.
+# Responde às mesmas chamadas que o painel faz (spreadsheets().get, values().get e
+# values().batchGet) com o mesmo formato de resposta, inclusive intervalos A1 parciais
+# (cabeçalho, cauda, colunas de assinatura e blocos da sincronização incremental).
+# A aba do mês tem o esquema da planilha real e o tamanho escolhido, de mil a milhões de linhas.
+
+COLUNAS_MES = ['Status', 'Produto', 'Valor', 'Data', 'Vendedor', 'Perfil', 'Origem', 'Banco', 'Espécie', 'Ajuda']
+COLUNAS_DIARIO = ['Vendedor', ' Meta Dia ', 'Valor', ' Aceite Dia ', ' Aceite Anterior ', ' Total ', 'Ligações', 'TMA']
+
+STATUS = ['PAGO', 'AG. INSS', 'BLOQUEADO', 'PENDENTE', 'CANCELADO', 'EM ANÁLISE']
+PESOS_STATUS = [0.35, 0.1, 0.05, 0.2, 0.2, 0.1]
+PRODUTOS = ['Cartão sem Saque', 'Cartão com Saque', 'Margem Livre', 'Saque Complementar']
+VENDEDORES = [
+    'ROSIMERY', 'ELLEN', 'ISABEL', 'ANTONIO', 'DANILO', 'DANIEL', 'VICTOR SILVA',
+    'VICTOR', 'CALL CENTER - SAIU', 'LARISSA', 'JOAO', 'ANNA', 'CALL CENTER - TESTE'
+]
+PERFIS = ['ATUAL', 'NOVO']
+ORIGENS = ['DISCADOR', 'URA', 'INDICAÇÃO', 'SMS']
+BANCOS = ['BMG', 'Pine', 'FACTA']
+ESPECIES = ['Aposentado', 'Pensionista']
+# Parte das propostas vem do estoque do mês anterior
+FRACAO_ESTOQUE = 0.05
+FRACAO_AJUDA = 0.01
+# A tabela da aba DIÁRIO começa em C7 (DIÁRIO!C7:K21)
+LINHA_DIARIO = 7
+COLUNA_DIARIO = 2
+
+PADRAO_INTERVALO = re.compile(r"^(?:'((?:[^']|'')+)'|([^!]+))(?:!(.+))?$")
+PADRAO_CELULAS = re.compile(r'^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$')
+TROCA_SEPARADORES = str.maketrans({',': '.', '.': ','})
+
+
+def formatar_real(valor):
+    return f'R$ {valor:,.2f}'.translate(TROCA_SEPARADORES)
+
+
+def indice_coluna(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+# A API omite as células vazias do fim de cada linha e as linhas vazias do fim do intervalo
+def aparar(linhas):
+    aparadas = []
+    for linha in linhas:
+        fim = len(linha)
+        while fim and linha[fim - 1] in ('', None):
+            fim -= 1
+        aparadas.append(linha[:fim] if fim < len(linha) else linha)
+    while aparadas and not aparadas[-1]:
+        aparadas.pop()
+    return aparadas
+
+
+# Aba do mês com o cabeçalho e as linhas como a API devolve (listas de textos)
+def gerar_mes(linhas, mes=2, ano=2025, semente=0):
+    gerador = np.random.default_rng(semente)
+
+    def escolher(opcoes, pesos=None):
+        return np.array(opcoes, dtype=object)[gerador.choice(len(opcoes), size=linhas, p=pesos)]
+
+    ultimo_dia = calendar.monthrange(ano, mes)[1]
+    mes_anterior, ano_anterior = (mes - 1, ano) if mes > 1 else (12, ano - 1)
+    datas_mes = [f'{dia:02d}/{mes:02d}/{ano}' for dia in range(1, ultimo_dia + 1)]
+    datas_estoque = [f'{dia:02d}/{mes_anterior:02d}/{ano_anterior}' for dia in range(1, 29)]
+    datas = np.where(
+        gerador.random(linhas) < FRACAO_ESTOQUE,
+        escolher(datas_estoque),
+        escolher(datas_mes),
+    )
+    valores = [formatar_real(valor) for valor in gerador.uniform(100, 5000, linhas).round(2)]
+
+    colunas = [
+        escolher(STATUS, PESOS_STATUS), escolher(PRODUTOS), valores, datas, escolher(VENDEDORES),
+        escolher(PERFIS), escolher(ORIGENS), escolher(BANCOS), escolher(ESPECIES),
+    ]
+    grade = [COLUNAS_MES] + [list(linha) for linha in zip(*colunas)]
+    for posicao in np.flatnonzero(gerador.random(linhas) < FRACAO_AJUDA):
+        grade[posicao + 1].append(str(gerador.integers(1, 30)))
+    return grade
+
+
+# Aba DIÁRIO: uma linha por vendedor e a linha Total, na posição da planilha real
+def gerar_diario(semente=0):
+    gerador = np.random.default_rng(semente)
+    linhas = []
+    for vendedor in VENDEDORES:
+        meta, dia, anterior = gerador.integers(1, 6), gerador.integers(0, 5), gerador.integers(0, 5)
+        linhas.append([vendedor, str(meta), formatar_real(dia * 1500.0), str(dia), str(anterior), str(dia + anterior),
+                       str(gerador.integers(20, 200)), f'{gerador.integers(1, 6)}:{gerador.integers(0, 60):02d}'])
+    totais = [sum(int(linha[posicao]) for linha in linhas) for posicao in (1, 3, 4, 5, 6)]
+    linhas.append(['Total', str(totais[0]), formatar_real(totais[1] * 1500.0), str(totais[1]), str(totais[2]),
+                   str(totais[3]), str(totais[4]), '3:00'])
+    return [[] for _ in range(LINHA_DIARIO - 1)] + [[''] * COLUNA_DIARIO + linha for linha in [COLUNAS_DIARIO] + linhas]
+
+
+def erro_http(status, mensagem):
+    return HttpError(httplib2.Response({'status': status}), mensagem.encode('utf-8'))
+
+
+class PedidoFake:
+    def __init__(self, planilha, responder):
+        self.planilha = planilha
+        self.responder = responder
+
+    def execute(self, num_retries=0):
+        if self.planilha.atraso:
+            time.sleep(self.planilha.atraso)
+        return self.responder()
+
+
+class ValoresFake:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def get(self, spreadsheetId=None, range=None, **kwargs):
+        self.planilha.registrar('values.get', [range])
+        return PedidoFake(self.planilha, lambda: self.planilha.intervalo(range))
+
+    def batchGet(self, spreadsheetId=None, ranges=None, **kwargs):
+        self.planilha.registrar('values.batchGet', ranges)
+        return PedidoFake(self.planilha, lambda: {
+            'spreadsheetId': spreadsheetId,
+            'valueRanges': [self.planilha.intervalo(intervalo) for intervalo in ranges],
+        })
+
+
+class PlanilhasFake:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def values(self):
+        return ValoresFake(self.planilha)
+
+    def get(self, spreadsheetId=None, fields=None, **kwargs):
+        self.planilha.registrar('get', [])
+        return PedidoFake(self.planilha, lambda: {
+            'sheets': [{'properties': {'title': titulo, 'index': indice}} for indice, titulo in enumerate(self.planilha.abas)]
+        })
+
+
+class PlanilhaFake:
+    def __init__(self, abas, atraso=0.0):
+        # título da aba -> linhas (listas de textos), na ordem das abas da planilha
+        self.abas = abas
+        self.atraso = atraso
+        self.chamadas = []
+        self._lock = threading.Lock()
+
+    # Mesmo ponto de entrada do cliente criado por googleapiclient.discovery.build
+    def spreadsheets(self):
+        return PlanilhasFake(self)
+
+    def registrar(self, metodo, intervalos):
+        with self._lock:
+            self.chamadas.append((metodo, tuple(intervalos)))
+
+    def intervalo(self, intervalo):
+        encontrado = PADRAO_INTERVALO.match(intervalo)
+        titulo = encontrado and (encontrado.group(1).replace("''", "'") if encontrado.group(1) else encontrado.group(2))
+        if titulo not in self.abas:
+            raise erro_http(400, f'Unable to parse range: {intervalo}')
+        grade = self.abas[titulo]
+        celulas = PADRAO_CELULAS.match(encontrado.group(3) or '')
+        if celulas is None:
+            raise erro_http(400, f'Unable to parse range: {intervalo}')
+        coluna_inicial, linha_inicial, coluna_final, linha_final = celulas.groups()
+        if encontrado.group(3) and ':' not in encontrado.group(3):
+            coluna_final, linha_final = coluna_inicial, linha_inicial
+
+        primeira = int(linha_inicial) - 1 if linha_inicial else 0
+        ultima = int(linha_final) if linha_final else len(grade)
+        inicio = indice_coluna(coluna_inicial) if coluna_inicial else 0
+        fim = indice_coluna(coluna_final) + 1 if coluna_final else None
+        linhas = grade[primeira:ultima]
+        if inicio or fim is not None:
+            linhas = [linha[inicio:fim] for linha in linhas]
+        resposta = {'range': intervalo, 'majorDimension': 'ROWS'}
+        valores = aparar(linhas)
+        if valores:
+            resposta['values'] = valores
+        return resposta
+
+
+# Planilha com a aba do mês ('Fev') no tamanho pedido e a aba DIÁRIO
+def planilha_padrao(linhas, semente=0, atraso=0.0):
+    return PlanilhaFake({'Fev': gerar_mes(linhas, 2, 2025, semente), 'DIÁRIO': gerar_diario(semente)}, atraso)
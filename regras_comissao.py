@@ -0,0 +1,150 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Regras de comissão e despesas da projeção de resultado.
+# As taxas e as despesas do mês ficam em regras_comissao.json (ou no arquivo de
+# REGRAS_COMISSAO_PATH); o arquivo é relido sozinho quando muda, sem novo deploy.
+#
+# Cada linha de comissão tem uma base e uma taxa:
+#   - Quantidade / Valor: soma da medida no cubo Status x Produto para os status e produtos da linha
+#   - Fixo: base informada no próprio arquivo
+#   - Derivada: fator aplicado à base de outra linha (ex.: expectativa de ativação = 20% dos emitidos)
+# As deduções são um percentual da receita bruta ou um valor fixo (ou lista de valores somados).
+
+CAMINHO_REGRAS = os.getenv(
+    "REGRAS_COMISSAO_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "regras_comissao.json")
+)
+
+
+class RegrasComissao:
+    def __init__(self, config):
+        self.config = config
+        self.comissoes = config['comissoes']
+        self.deducoes = config['deducoes']
+        self.ids = [linha['id'] for linha in self.comissoes]
+        self.ids_deducoes = [deducao['id'] for deducao in self.deducoes]
+
+        self.taxas = np.array([linha['taxa'] for linha in self.comissoes], dtype=float)
+        self.fixos = np.array([linha.get('base', 0) if linha['medida'] == 'Fixo' else 0 for linha in self.comissoes], dtype=float)
+        self.grupos = sorted({linha['grupo'] for linha in self.comissoes})
+        self.matriz_grupos = np.array([[linha['grupo'] == grupo for grupo in self.grupos] for linha in self.comissoes], dtype=float)
+
+        derivadas = [(i, linha) for i, linha in enumerate(self.comissoes) if linha['medida'] == 'Derivada']
+        self.derivadas = np.array([i for i, _ in derivadas], dtype=int)
+        self.origens = np.array([self.ids.index(linha['de']) for _, linha in derivadas], dtype=int)
+        self.fatores = np.array([linha['fator'] for _, linha in derivadas], dtype=float)
+
+        self.percentuais = np.array([deducao.get('percentual', 0) for deducao in self.deducoes], dtype=float)
+        self.valores = np.array([np.sum(deducao.get('valor', 0)) for deducao in self.deducoes], dtype=float)
+
+    # Bases das linhas Quantidade, Valor e Fixo a partir do cubo (as derivadas ficam zeradas aqui)
+    def bases_diretas(self, cubo):
+        resumo = cubo.groupby(level=['Status', 'Produto'], observed=True, dropna=False).sum()
+        status = resumo.index.get_level_values('Status')
+        produtos = resumo.index.get_level_values('Produto')
+        bases = self.fixos.copy()
+        for i, linha in enumerate(self.comissoes):
+            if linha['medida'] in ('Quantidade', 'Valor'):
+                selecao = np.isin(status, linha['status']) & np.isin(produtos, linha['produtos'])
+                bases[i] += resumo[linha['medida']].to_numpy()[selecao].sum()
+        return bases
+
+    # Avalia k cenários de uma vez: taxas (k x linhas), fatores (k x derivadas),
+    # percentuais e valores (k x deduções)
+    def avaliar(self, bases, taxas, fatores, percentuais, valores):
+        quantidade = np.tile(bases, (len(taxas), 1))
+        quantidade[:, self.derivadas] += fatores * bases[self.origens]
+        comissao = quantidade * taxas
+        subtotais = comissao @ self.matriz_grupos
+        total = comissao.sum(axis=1)
+        deducoes = total[:, None] * percentuais + valores
+        return {
+            'quantidade': quantidade,
+            'comissao': comissao,
+            'subtotais': subtotais,
+            'total': total,
+            'deducoes': deducoes,
+            'liquida': total + deducoes.sum(axis=1),
+        }
+
+    def _padrao(self, bases):
+        return self.avaliar(
+            bases, self.taxas[None, :], self.fatores[None, :], self.percentuais[None, :], self.valores[None, :]
+        )
+
+    # Tabelas de projeção (custo) e de deduções (receita) e a receita líquida
+    def calcular(self, cubo):
+        resultado = self._padrao(self.bases_diretas(cubo))
+
+        linhas = []
+        for g, grupo in enumerate(self.grupos):
+            for i, linha in enumerate(self.comissoes):
+                if linha['grupo'] == grupo:
+                    linhas.append((linha['projecao'], resultado['quantidade'][0, i], resultado['comissao'][0, i], linha['referencia']))
+            linhas.append((self.config['subtotais'][str(grupo)], np.nan, resultado['subtotais'][0, g], ''))
+        linhas.append((self.config['total'], np.nan, resultado['total'][0], ''))
+        custo = pd.DataFrame(linhas, columns=['PROJEÇÕES', 'Qtde/Valor', 'Cms', '% referência'])
+
+        receita = pd.DataFrame({
+            'DEDUÇÃO DE CUSTOS E DESPESAS': [self.config['receita_bruta']] + [deducao['descricao'] for deducao in self.deducoes],
+            'Valor': np.concatenate([resultado['total'], resultado['deducoes'][0]]),
+            '% referência': [''] + [deducao.get('referencia', '') for deducao in self.deducoes],
+        })
+        return custo, receita, resultado['liquida'][0]
+
+    # Simulação em lote: cada linha de "cenarios" é um cenário; as colunas
+    # "taxa.<id>", "fator.<id>" e "deducao.<id>" substituem os valores do arquivo
+    def simular(self, cubo, cenarios):
+        k = len(cenarios)
+
+        def parametros(prefixo, ids, padrao):
+            matriz = np.tile(padrao, (k, 1))
+            for j, identificador in enumerate(ids):
+                coluna = f'{prefixo}.{identificador}'
+                if coluna in cenarios:
+                    matriz[:, j] = cenarios[coluna].to_numpy(dtype=float)
+            return matriz
+
+        ids_derivadas = [self.ids[i] for i in self.derivadas]
+        percentual = self.percentuais != 0
+        deducoes = parametros('deducao', self.ids_deducoes, np.where(percentual, self.percentuais, self.valores))
+        resultado = self.avaliar(
+            self.bases_diretas(cubo),
+            parametros('taxa', self.ids, self.taxas),
+            parametros('fator', ids_derivadas, self.fatores),
+            np.where(percentual, deducoes, 0),
+            np.where(percentual, 0, deducoes),
+        )
+        return cenarios.assign(receita_bruta=resultado['total'], receita_liquida=resultado['liquida'])
+
+    # Receita bruta e líquida com o mesmo fator em todas as linhas derivadas (ex.: a taxa de ativação
+    # dos emitidos). O fator do arquivo entra sempre, e esse cenário reproduz a receita líquida de calcular().
+    def simular_fatores(self, cubo, fatores):
+        if not len(self.derivadas):
+            return None
+        fatores = np.union1d(fatores, self.fatores)
+        cenarios = pd.DataFrame({f'fator.{self.ids[i]}': fatores for i in self.derivadas})
+        resultado = self.simular(cubo, cenarios)
+        return pd.DataFrame({
+            'fator': fatores,
+            'arquivo': np.isin(fatores, self.fatores),
+            'receita_bruta': resultado['receita_bruta'].to_numpy(),
+            'receita_liquida': resultado['receita_liquida'].to_numpy(),
+        })
+
+    def descricao_derivadas(self):
+        return ' / '.join(self.comissoes[i]['projecao'] for i in self.derivadas)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_regras(caminho, modificado_em):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return RegrasComissao(json.load(arquivo))
+
+
+def obter_regras(caminho=CAMINHO_REGRAS):
+    return carregar_regras(caminho, os.path.getmtime(caminho))
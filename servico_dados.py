@@ -0,0 +1,155 @@
+import os
+import datetime
+import threading
+
+import pandas as pd
+
+import agregacoes
+import calendario
+import dados_planilha
+import filtros
+import formatacao
+import historico
+import ingestao
+import instrumentacao
+import paginas
+import regras_comissao
+
+# Serviço de dados compartilhado por todas as sessões do processo.
+# Uma única instância descobre a aba do mês, busca a planilha (pelo cache de dados_planilha),
+# trata e agrega os dados. Cada versão dos dados vira um Instantaneo com os produtos
+# calculados uma vez só, e todas as sessões abertas recebem o mesmo Instantaneo:
+# chamadas à API e memória não crescem com o número de painéis abertos.
+
+# Fatores das linhas derivadas (expectativa de ativação) simulados na página de comissões
+FATORES_SIMULACAO = [float(fator) for fator in os.getenv("FATORES_SIMULACAO_ATIVACAO", "0.1,0.15,0.2,0.25,0.3").split(",") if fator.strip()]
+
+
+class Instantaneo:
+    def __init__(self, spreadsheet_id, aba, dataframes, versoes, buscar, listar):
+        self.aba, self.mes, self.ano = aba
+        self.versoes = versoes
+        self.chave = (self.aba, versoes['mes'], versoes['diario'])
+        self._dataframes = dataframes
+        self.produtos = paginas.ProdutosDados()
+        self._registrar_produtos(spreadsheet_id, buscar, listar)
+
+    @property
+    def versao(self):
+        return self.versoes['mes']
+
+    # Visão somente leitura: cópia rasa com copy-on-write, sem duplicar os dados compartilhados
+    def visao(self, nome):
+        return self._dataframes[nome].copy(deep=False)
+
+    # Memória dos DataFrames desta versão. As propostas tratadas são comparadas com as mesmas
+    # linhas guardadas como texto em objetos Python (o DataFrame de strings de antes da leitura em Arrow).
+    def relatorio_memoria(self):
+        planilha = self._dataframes['mes']
+        como_texto = planilha.astype(object)
+        texto_por_linha = instrumentacao.memoria_dataframe(como_texto) / len(como_texto) if len(como_texto) else 0
+        dados = {'mes (planilha)': planilha, 'diario (planilha)': self._dataframes['diario']}
+        dados.update({
+            nome: produto for nome, produto in self.produtos.prontos().items()
+            if isinstance(produto, (pd.DataFrame, pd.Series))
+        })
+        linhas = []
+        for nome, produto in dados.items():
+            memoria = instrumentacao.memoria_dataframe(produto) / instrumentacao.MB
+            texto = texto_por_linha * len(produto) / instrumentacao.MB if nome in PRODUTOS_POR_PROPOSTA else None
+            linhas.append({
+                'Dados': nome, 'Linhas': len(produto), 'Memória (MB)': memoria, 'Como texto (MB)': texto,
+                'Redução': 1 - memoria / texto if texto else None,
+            })
+        return pd.DataFrame(linhas)
+
+    def _registrar_produtos(self, spreadsheet_id, buscar, listar):
+        versao = self.versao
+        registrar = self.produtos.registrar
+        registrar('vendas', lambda: ingestao.vendas_tratadas(self._dataframes['mes'], versao, self.mes, self.ano))
+        registrar('validas', ingestao.selecionar_validas, 'vendas')
+        registrar('inicio_mes', self._inicio_mes, 'validas')
+        registrar('referencia', data_referencia, 'validas')
+        registrar('dias', dias_do_mes, 'inicio_mes', 'referencia')
+        registrar('projecao', lambda vendas, inicio_mes, referencia: projecao_vendedores(vendas, versao, inicio_mes, referencia),
+                  'vendas', 'inicio_mes', 'referencia')
+        registrar('metricas', lambda vendas: agregacoes.metricas_por_vendedor(vendas, versao), 'vendas')
+        registrar('cubo', lambda validas: agregacoes.cubo_status_produto(validas, versao), 'validas')
+        registrar('indice', lambda validas: filtros.indice_filtros(validas, versao), 'validas')
+        registrar('aceites_diarios', lambda validas, inicio_mes: agregacoes.aceites_diarios(validas, versao, inicio_mes),
+                  'validas', 'inicio_mes')
+        registrar('comissoes', comissoes, 'cubo')
+        registrar('simulacao_ativacao', simulacao_ativacao, 'cubo')
+        registrar('historico', lambda: historico.congelar_fechados(spreadsheet_id, buscar, listar))
+
+    def _inicio_mes(self, validas):
+        if self.mes is not None:
+            return ingestao.inicio_do_mes(validas['Data'], self.mes, self.ano)
+        return validas['Data'].min().to_period('M').start_time
+
+
+# Produtos com uma linha por proposta da aba do mês
+PRODUTOS_POR_PROPOSTA = ['vendas', 'validas']
+
+
+# Dias úteis do mês até a última data com propostas (calendário com feriados, sem ler a planilha)
+def data_referencia(validas):
+    ultima_data = validas['Data'].max()
+    return min(ultima_data.date(), datetime.date.today()) if pd.notna(ultima_data) else datetime.date.today()
+
+
+def dias_do_mes(inicio_mes, referencia):
+    dias_passados, dias_uteis, dias_restante = calendario.dias_do_mes(inicio_mes, referencia)
+    # Evita divisão por zero antes do primeiro dia útil e depois do último
+    return max(dias_passados, 1), dias_uteis, max(dias_restante, 1)
+
+
+def projecao_vendedores(vendas, versao, inicio_mes, referencia):
+    curvas = calendario.curvas_projecao(vendas, versao, inicio_mes.date(), calendario.fim_do_mes(inicio_mes))
+    return calendario.projecao_na_data(curvas, referencia)
+
+
+def comissoes(cubo):
+    custo, receita, projecao_receita_liquida = regras_comissao.obter_regras().calcular(cubo)
+    return custo, receita, formatacao.formatar_valor(projecao_receita_liquida)
+
+
+def simulacao_ativacao(cubo):
+    regras = regras_comissao.obter_regras()
+    return regras.descricao_derivadas(), regras.simular_fatores(cubo, FATORES_SIMULACAO)
+
+
+class ServicoDados:
+    def __init__(self):
+        self._instantaneos = {}
+        self._lock = threading.Lock()
+
+    # Instantaneo da versão atual dos dados, ou None se a planilha não tiver abas de mês
+    def obter(self, spreadsheet_id, buscar, listar):
+        aba = historico.aba_atual(spreadsheet_id, listar)
+        if aba is None:
+            return None
+        dataframes, versoes = dados_planilha.obter_dataframes(spreadsheet_id, buscar, aba[0])
+        with self._lock:
+            atual = self._instantaneos.get(spreadsheet_id)
+            if atual is None or atual.chave != (aba[0], versoes['mes'], versoes['diario']):
+                atual = Instantaneo(spreadsheet_id, aba, dataframes, versoes, buscar, listar)
+                self._instantaneos[spreadsheet_id] = atual
+        return atual
+
+
+servico = ServicoDados()
+
+
+def obter(spreadsheet_id, buscar, listar):
+    return servico.obter(spreadsheet_id, buscar, listar)
+
+
+# Chave da versão atual dos dados (a mesma de Instantaneo.chave) sem chamar a API: as sessões
+# abertas comparam com a do Instantaneo que desenharam para saber se precisam ser refeitas
+def chave_atual(spreadsheet_id, listar):
+    aba = historico.aba_atual(spreadsheet_id, listar)
+    if aba is None:
+        return None
+    versoes = dados_planilha.versoes(spreadsheet_id, aba[0])
+    return (aba[0], versoes['mes'], versoes['diario'])
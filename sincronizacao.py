@@ -0,0 +1,201 @@
+import os
+import hashlib
+
+import pandas as pd
+
+import ingestao
+from leitura_valores import RelatorioLeitura, ler_linhas
+
+# Sincronização incremental de uma aba inteira da planilha.
+# Em vez de baixar a aba completa a cada atualização, busca só:
+#   - o cabeçalho (se mudar, recarrega tudo);
+#   - as linhas novas depois da última linha conhecida;
+#   - as colunas de assinatura (por padrão, todas as colunas tratadas em ingestao.py, de onde
+#     saem as agregações), usadas para achar os blocos de linhas que foram editados
+#     e que precisam ser baixados de novo.
+# Edições nas demais colunas entram na carga completa feita a cada horário publicado de
+# atualização (dados_planilha.py) ou a cada tantas sincronizações.
+
+TAMANHO_BLOCO = int(os.getenv("TAMANHO_BLOCO_SINCRONIZACAO", "200"))
+COLUNAS_ASSINATURA = [
+    coluna.strip() for coluna in os.getenv("COLUNAS_ASSINATURA", ",".join(ingestao.COLUNAS_TRATADAS)).split(",") if coluna.strip()
+]
+# A cada tantas sincronizações faz uma carga completa, para pegar edições fora das colunas de assinatura
+SINCRONIZACOES_ATE_CARGA_COMPLETA = int(os.getenv("SINCRONIZACOES_ATE_CARGA_COMPLETA", "12"))
+
+
+def letra_coluna(indice):
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+# Monta o DataFrame completando as linhas curtas (a API omite as células vazias do fim da linha)
+def montar_dataframe(cabecalho, linhas, relatorio=None):
+    return ler_linhas(cabecalho, linhas, relatorio)
+
+
+def hash_bloco(linhas):
+    conteudo = '\x1e'.join('\x1f'.join(linha) for linha in linhas)
+    return hashlib.blake2b(conteudo.encode('utf-8'), digest_size=8).digest()
+
+
+class SincronizacaoIncremental:
+    def __init__(self, aba, colunas_assinatura=COLUNAS_ASSINATURA, tamanho_bloco=TAMANHO_BLOCO):
+        self.aba = aba
+        self.colunas_assinatura = colunas_assinatura
+        self.tamanho_bloco = tamanho_bloco
+        # Só o cabeçalho, os hashes dos blocos e o DataFrame ficam guardados; as linhas
+        # devolvidas pela API são descartadas depois de lidas
+        self.cabecalho = None
+        self.dataframe = None
+        self.hashes = []
+        self.sincronizacoes = 0
+        # Linhas fora do formato encontradas na última carga completa
+        self.relatorio = None
+        self._cauda = []
+        self._blocos = []
+        self._parciais = []
+
+    @property
+    def total(self):
+        return len(self.dataframe) if self.dataframe is not None else 0
+
+    def _intervalo(self, inicio, fim=''):
+        ultima = letra_coluna(len(self.cabecalho) - 1)
+        return f"'{self.aba}'!A{inicio}:{ultima}{fim}"
+
+    def _indices_assinatura(self):
+        return [self.cabecalho.index(coluna) for coluna in self.colunas_assinatura if coluna in self.cabecalho]
+
+    def _assinaturas(self, linhas):
+        indices = self._indices_assinatura()
+        return [[linha[i] if i < len(linha) else '' for i in indices] for linha in linhas]
+
+    # Assinaturas das linhas [inicio, fim) lidas do DataFrame já montado
+    def _assinaturas_dataframe(self, inicio, fim):
+        colunas = [self.dataframe.iloc[inicio:fim, i].fillna('').tolist() for i in self._indices_assinatura()]
+        return [list(linha) for linha in zip(*colunas)] if colunas else [[] for _ in range(fim - inicio)]
+
+    def _calcular_hashes(self, assinaturas):
+        return [
+            hash_bloco(assinaturas[inicio:inicio + self.tamanho_bloco])
+            for inicio in range(0, len(assinaturas), self.tamanho_bloco)
+        ]
+
+    def _linha_vazia(self, posicao):
+        return not self.dataframe.iloc[posicao].fillna('').ne('').any()
+
+    def precisa_carga_completa(self):
+        return self.cabecalho is None or self.sincronizacoes >= SINCRONIZACOES_ATE_CARGA_COMPLETA
+
+    def carregar(self, valores):
+        self.cabecalho = valores[0] if valores else []
+        self.relatorio = RelatorioLeitura()
+        self.dataframe = montar_dataframe(valores[0], valores[1:], self.relatorio) if valores else pd.DataFrame()
+        self.hashes = self._calcular_hashes(self._assinaturas(valores[1:])) if valores else []
+        self.sincronizacoes = 0
+
+    # Última linha conhecida como a API devolve, sem as células vazias do fim
+    def _ultima_linha(self):
+        if not self.total:
+            return self.cabecalho
+        linha = self.dataframe.iloc[self.total - 1].fillna('').tolist()
+        while linha and linha[-1] == '':
+            linha.pop()
+        return linha
+
+    # Intervalos da vigia, bem mais leve que a sondagem: cabeçalho e da última linha conhecida em diante
+    def intervalos_vigia(self):
+        return [f"'{self.aba}'!1:1", self._intervalo(max(self.total + 1, 1))]
+
+    # Linhas novas, apagadas do fim ou cabeçalho diferente; edições no meio ficam para a sondagem
+    def mudou(self, respostas):
+        cabecalho = respostas[0][0] if respostas[0] else []
+        return cabecalho != self.cabecalho or respostas[1] != [self._ultima_linha()]
+
+    # Intervalos da sondagem: cabeçalho, cauda e uma coluna por assinatura
+    def intervalos_sonda(self):
+        primeira_nova = self.total + 2
+        ultima_conhecida = max(self.total + 1, 2)
+        intervalos = [f"'{self.aba}'!1:1", self._intervalo(primeira_nova)]
+        for indice in self._indices_assinatura():
+            coluna = letra_coluna(indice)
+            intervalos.append(f"'{self.aba}'!{coluna}2:{coluna}{ultima_conhecida}")
+        return intervalos
+
+    # Devolve os intervalos dos blocos alterados, ou None quando é melhor recarregar a aba inteira
+    def aplicar_sonda(self, respostas):
+        cabecalho = respostas[0][0] if respostas[0] else []
+        if cabecalho != self.cabecalho:
+            return None
+
+        total = self.total
+        colunas = [coluna + [[]] * (total - len(coluna)) for coluna in respostas[2:]]
+        assinaturas = [[celula[0] if celula else '' for celula in linha] for linha in zip(*colunas)]
+        hashes = self._calcular_hashes(assinaturas) if colunas else self.hashes
+        alterados = [bloco for bloco, valor in enumerate(hashes) if valor != self.hashes[bloco]]
+        if len(alterados) > len(self.hashes) // 2 + 1:
+            return None
+
+        self._cauda = respostas[1]
+        self._blocos = alterados
+        return [
+            self._intervalo(bloco * self.tamanho_bloco + 2, min((bloco + 1) * self.tamanho_bloco, total) + 1)
+            for bloco in alterados
+        ]
+
+    # Blocos e cauda lidos numa sincronização: as linhas fora do formato só são avisadas
+    def _relatorio_parcial(self, posicao):
+        relatorio = RelatorioLeitura(posicao + 2)
+        self._parciais.append(relatorio)
+        return relatorio
+
+    # Junta os blocos alterados e a cauda ao DataFrame já conhecido; devolve se algo mudou
+    def aplicar_blocos(self, respostas):
+        cabecalho = self.cabecalho
+        total = self.total
+        partes = []
+        inicio = 0
+        for bloco, novas in zip(self._blocos, respostas):
+            primeira = bloco * self.tamanho_bloco
+            ultima = min(primeira + self.tamanho_bloco, total)
+            # A API omite as linhas vazias no fim do intervalo
+            novas = novas + [[]] * (ultima - primeira - len(novas))
+            partes.append(self.dataframe.iloc[inicio:primeira])
+            partes.append(montar_dataframe(cabecalho, novas, self._relatorio_parcial(primeira)))
+            inicio = ultima
+        partes.append(self.dataframe.iloc[inicio:])
+
+        if self._cauda:
+            partes.append(montar_dataframe(cabecalho, self._cauda, self._relatorio_parcial(total)))
+
+        alterado = bool(self._blocos or self._cauda)
+        if alterado:
+            self.dataframe = pd.concat(partes, ignore_index=True)
+            fim = self.total
+            while fim and self._linha_vazia(fim - 1):
+                fim -= 1
+            self.dataframe = self.dataframe.iloc[:fim]
+            # Refaz só os hashes dos blocos lidos e dos blocos a partir do fim antigo da aba
+            primeiro_fim = min(total, fim) // self.tamanho_bloco
+            hashes = self.hashes[:primeiro_fim]
+            for bloco in self._blocos:
+                if bloco < primeiro_fim:
+                    inicio = bloco * self.tamanho_bloco
+                    hashes[bloco] = hash_bloco(self._assinaturas_dataframe(inicio, inicio + self.tamanho_bloco))
+            hashes += self._calcular_hashes(self._assinaturas_dataframe(primeiro_fim * self.tamanho_bloco, fim))
+            self.hashes = hashes
+        self.sincronizacoes += 1
+        for relatorio in self._parciais:
+            # Linhas apagadas do fim da aba chegam vazias, mas não são linhas vazias da planilha
+            relatorio.vazias = [linha for linha in relatorio.vazias if linha < self.total + 2]
+            if relatorio.malformadas or relatorio.colunas_nao_texto:
+                print(f'{self.aba}: {relatorio.resumo()}')
+        self._cauda = []
+        self._blocos = []
+        self._parciais = []
+        return alterado
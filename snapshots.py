@@ -0,0 +1,78 @@
+import os
+import re
+import datetime
+
+import pandas as pd
+
+import instrumentacao
+
+# Snapshots locais em Parquet dos intervalos lidos da planilha.
+# Cada versão nova é gravada em DIRETORIO_SNAPSHOTS/<intervalo>/<AAAAMMDD-HHMMSS>-v<versão>.parquet,
+# e na partida o painel abre com o último snapshot enquanto a planilha é consultada em segundo plano.
+# O que se grava é o DataFrame cru da planilha (colunas de texto), antes da normalização.
+# O Parquet não aceita colunas repetidas ou em branco, então cada coluna vai gravada como
+# '<posição>:<nome>' e o nome original é recuperado na leitura.
+
+DIRETORIO_SNAPSHOTS = os.getenv("DIRETORIO_SNAPSHOTS", "snapshots")
+MANTER_SNAPSHOTS = int(os.getenv("MANTER_SNAPSHOTS", "5"))
+FORMATO_MOMENTO = '%Y%m%d-%H%M%S'
+PADRAO_ARQUIVO = re.compile(r'^(\d{8}-\d{6})-v(\d+)\.parquet$')
+PADRAO_COLUNA = re.compile(r'^\d+:')
+
+
+def diretorio(intervalo):
+    nome = re.sub(r'\W+', '_', intervalo).strip('_') or 'intervalo'
+    return os.path.join(DIRETORIO_SNAPSHOTS, nome)
+
+
+# Momento e versão como número, para que v10 venha depois de v9
+def ordem(arquivo):
+    momento, versao = PADRAO_ARQUIVO.match(arquivo).groups()
+    return momento, int(versao)
+
+
+def listar(intervalo):
+    pasta = diretorio(intervalo)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted((arquivo for arquivo in os.listdir(pasta) if PADRAO_ARQUIVO.match(arquivo)), key=ordem)
+
+
+def salvar(intervalo, dataframe, versao, momento=None):
+    momento = momento or datetime.datetime.now()
+    pasta = diretorio(intervalo)
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{momento.strftime(FORMATO_MOMENTO)}-v{versao}.parquet')
+    temporario = caminho + '.tmp'
+    colunas = [f'{posicao}:{coluna}' for posicao, coluna in enumerate(dataframe.columns)]
+    try:
+        with instrumentacao.medir('snapshot:gravar', len(dataframe)):
+            dataframe.set_axis(colunas, axis=1).to_parquet(temporario, index=False)
+            os.replace(temporario, caminho)
+    except Exception as err:
+        print(f'{intervalo}: snapshot não gravado ({err})')
+        instrumentacao.registrar('snapshot:falha', 0)
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return None
+
+    for antigo in listar(intervalo)[:-MANTER_SNAPSHOTS]:
+        os.remove(os.path.join(pasta, antigo))
+    return caminho
+
+
+# Devolve (DataFrame, momento da leitura) do snapshot mais recente, ou None
+def carregar_ultimo(intervalo):
+    for arquivo in reversed(listar(intervalo)):
+        try:
+            dataframe = pd.read_parquet(os.path.join(diretorio(intervalo), arquivo))
+        except Exception as err:
+            print(err)
+            continue
+        # O Parquet devolve string[python]; volta para string[pyarrow] para que o DataFrame
+        # restaurado seja igual ao lido da planilha e a versão não mude a cada partida
+        tipos = {coluna: 'string[pyarrow]' for coluna, tipo in dataframe.dtypes.items() if isinstance(tipo, pd.StringDtype)}
+        dataframe = dataframe.astype(tipos).set_axis([PADRAO_COLUNA.sub('', coluna, count=1) for coluna in dataframe.columns], axis=1)
+        momento = datetime.datetime.strptime(PADRAO_ARQUIVO.match(arquivo).group(1), FORMATO_MOMENTO)
+        return dataframe, momento
+    return None
@@ -0,0 +1,40 @@
+import pandas as pd
+
+import agregacoes
+
+
+def aceites_exemplo():
+    dias = pd.to_datetime(['2025-02-03', '2025-02-04'])
+    indice = pd.Index(['ANA', 'BRUNO'], name='Vendedor')
+    quantidade = pd.DataFrame([[2, 1], [0, 3]], index=indice, columns=dias)
+    valor = pd.DataFrame([[200.0, 100.0], [0.0, 300.0]], index=indice, columns=dias)
+    return quantidade, valor
+
+
+def metas_exemplo():
+    return pd.DataFrame({
+        'Meta Cartões': [40, 40, 20],
+        'Meta Saque': [0, 0, 0],
+        'Início': ['-', '-', '-'],
+        'Ativo': [True, True, False],
+    }, index=pd.Index(['ANA', 'BRUNO', 'CALL CENTER - SAIU'], name='Vendedor'))
+
+
+def test_resumo_do_dia_ignora_vendedores_inativos():
+    painel = agregacoes.resumo_do_dia(aceites_exemplo(), '2025-02-04', metas_exemplo())
+
+    assert 'CALL CENTER - SAIU' not in painel['Vendedor'].tolist()
+    so_ativos = agregacoes.resumo_do_dia(aceites_exemplo(), '2025-02-04', metas_exemplo().iloc[:2])
+    assert painel['Meta Dia'].sum() == so_ativos['Meta Dia'].sum()
+
+
+def test_resumo_do_dia_mantem_inativo_com_propostas_sem_meta():
+    quantidade, valor = aceites_exemplo()
+    quantidade.loc['CALL CENTER - SAIU'] = [1, 1]
+    valor.loc['CALL CENTER - SAIU'] = [50.0, 50.0]
+
+    painel = agregacoes.resumo_do_dia((quantidade, valor), '2025-02-04', metas_exemplo()).set_index('Vendedor')
+
+    assert painel.loc['CALL CENTER - SAIU', 'Meta Dia'] == 0
+    assert painel.loc['CALL CENTER - SAIU', 'Aceite Dia'] == 1
+    assert painel.loc['CALL CENTER - SAIU', 'Total'] == 2
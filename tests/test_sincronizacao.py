@@ -0,0 +1,78 @@
+import re
+
+import sincronizacao
+from sincronizacao import SincronizacaoIncremental
+
+CABECALHO = ['Status', 'Produto', 'Valor', 'Data', 'Vendedor', 'Perfil', 'Origem', 'Banco', 'Espécie', 'Ajuda']
+
+
+def aba_exemplo(linhas=450):
+    aba = [CABECALHO]
+    for i in range(linhas):
+        aba.append([
+            'PENDENTE', 'Margem Livre', f'R$ {i},00', f'{i % 28 + 1:02d}/02/2025', f'VENDEDOR {i % 7}',
+            'ATUAL', 'URA', 'BMG', 'Aposentado',
+        ])
+    return aba
+
+
+def indice_coluna(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+# Resposta da API para um intervalo A1, sem as células e linhas vazias do fim
+def ler(aba, intervalo):
+    cabecalho = re.match(r"'[^']+'!(\d+):(\d+)$", intervalo)
+    if cabecalho:
+        linhas = aba[int(cabecalho[1]) - 1:int(cabecalho[2])]
+    else:
+        partes = re.match(r"'[^']+'!([A-Z]+)(\d+):([A-Z]+)(\d*)$", intervalo)
+        inicio, fim = indice_coluna(partes[1]), indice_coluna(partes[3])
+        ultima = int(partes[4]) if partes[4] else len(aba)
+        linhas = [linha[inicio:fim + 1] for linha in aba[int(partes[2]) - 1:ultima]]
+    linhas = [list(linha) for linha in linhas]
+    for linha in linhas:
+        while linha and linha[-1] == '':
+            linha.pop()
+    while linhas and not linhas[-1]:
+        linhas.pop()
+    return linhas
+
+
+def sincronizar(sincronizacao_aba, aba):
+    blocos = sincronizacao_aba.aplicar_sonda([ler(aba, intervalo) for intervalo in sincronizacao_aba.intervalos_sonda()])
+    assert blocos is not None
+    return blocos, sincronizacao_aba.aplicar_blocos([ler(aba, intervalo) for intervalo in blocos])
+
+
+def test_assinatura_padrao_cobre_as_colunas_tratadas():
+    for coluna in ['Status', 'Valor', 'Data', 'Vendedor', 'Produto', 'Perfil', 'Origem']:
+        assert coluna in sincronizacao.COLUNAS_ASSINATURA
+
+
+def test_edicao_so_no_perfil_e_sincronizada():
+    aba = aba_exemplo()
+    sincronizacao_aba = SincronizacaoIncremental('Fev')
+    sincronizacao_aba.carregar(aba)
+
+    aba[300][5] = 'NOVO'
+    blocos, alterado = sincronizar(sincronizacao_aba, aba)
+
+    assert alterado
+    assert len(blocos) == 1
+    assert sincronizacao_aba.dataframe['Perfil'].iloc[299] == 'NOVO'
+    assert sincronizacao_aba.dataframe.equals(sincronizacao.montar_dataframe(aba[0], aba[1:]))
+
+
+def test_sem_edicao_nada_muda():
+    aba = aba_exemplo()
+    sincronizacao_aba = SincronizacaoIncremental('Fev')
+    sincronizacao_aba.carregar(aba)
+
+    blocos, alterado = sincronizar(sincronizacao_aba, aba)
+
+    assert blocos == []
+    assert not alterado